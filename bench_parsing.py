@@ -0,0 +1,80 @@
+"""
+Microbenchmark for chat command parsing and room name resolution
+
+Usage:
+python bench_parsing.py [lines] [min lines per second]
+
+Parses a synthetic chat of the given number of lines (default 100000) made of valid commands, abbreviations, typos,
+several commands per line and ordinary chatter. Exits with status 1 if the parse rate is below the minimum given
+"""
+
+import sys
+import time
+import random
+from command_grammar import CommandGrammar, RoomIndex
+from conf import room_names
+
+
+def synthetic_lines(count, seed=0):
+    """
+    Returns count chat lines
+    :param count:
+    :param seed:
+    :return: list of str
+    """
+
+    rng = random.Random(seed)
+    lines = []
+
+    for _ in range(count):
+        room = rng.choice(room_names)
+        kind = rng.random()
+        if kind < 0.4:
+            lines.append(f"AssignMeTo: {room}")
+        elif kind < 0.55:
+            lines.append(f"AssignMeTo: {room[:rng.randint(3, len(room))].lower()}")
+        elif kind < 0.7:
+            i = rng.randrange(len(room))
+            lines.append(f"AssignMeTo: {room[:i]}{room[i + 1:]}")
+        elif kind < 0.8:
+            lines.append(f"AssignMeTo: {room} Broadcast: Moving to {room} now")
+        else:
+            lines.append("Thanks everyone, that was a great class! See you in the next one")
+
+    return lines
+
+
+def bench(lines):
+    """
+    Parses lines and resolves move targets the way commands.parse_message does
+    :param lines:
+    :return: (lines per second, commands found, targets resolved)
+    """
+
+    grammar = CommandGrammar({"move": "AssignMeTo: ", "broadcast": "Broadcast: "})
+    room_index = RoomIndex(room_names)
+    found = 0
+    resolved = 0
+
+    start = time.perf_counter()
+    for line in lines:
+        for command, argument in grammar.parse(line):
+            found += 1
+            if command == "move" and room_index.resolve(argument) is not None:
+                resolved += 1
+    elapsed = time.perf_counter() - start
+
+    return len(lines) / elapsed, found, resolved
+
+
+if __name__ == "__main__":
+
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    min_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    rate, n_found, n_resolved = bench(synthetic_lines(n_lines))
+    print(f"{n_lines} lines: {rate:,.0f} lines/s, {n_found} commands, {n_resolved} move targets resolved")
+
+    if rate < min_rate:
+        print(f"Below minimum of {min_rate:,.0f} lines/s")
+        sys.exit(1)
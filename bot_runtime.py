@@ -0,0 +1,256 @@
+"""
+asyncio runtime for ZoomBot. Reading the chat, parsing commands and acting on the Zoom page run as separate stages
+connected by bounded queues, so a slow move no longer holds up reading the chat or closing help windows
+"""
+
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from commands import read_chat, parse_message, broadcast, make_moves, refresh_roster
+from scheduler import AdaptiveInterval
+
+# Lower numbers are taken off the action queue first
+HELP_PRIORITY       = 0
+BROADCAST_PRIORITY  = 1
+READ_PRIORITY       = 2
+MOVE_PRIORITY       = 3
+
+
+def close_help_if_open(zm):
+    """
+    Closes the "Ask Host for Help" window if it is open
+    :param zm: ZoomMeeting
+    :return:
+    """
+
+    if zm.ask_for_help_window_open():
+        zm.close_ask_for_help()
+
+
+class BotRuntime(object):
+    """
+    Runs the bot as seven asyncio stages, plus an eighth if on_metrics is given:
+    - ingest reads the chat and puts each line on the line queue. It polls quickly after activity and backs off while
+      the chat is idle
+    - help checks for "Ask for Help" windows every help_interval seconds
+    - roster refreshes the roster index every roster_interval seconds
+    - staging applies staged pre-assignments every staging_interval seconds until rooms are opened, if staging is on
+    - memory prints the sizes of the bot's in-memory stores every memory_report_interval seconds
+    - metrics calls on_metrics with the ZoomMeeting every metrics_interval seconds, e.g. to report to orchestrator.py
+    - parse takes lines off the line queue and turns them into actions. Broadcasts are queued straight away. Moves are
+      collected until the line queue is empty or move_batch_size is reached and are then queued as one batch, which is
+      validated and made by commands.make_moves
+    - the actuator takes actions off the action queue by priority (help, broadcast, chat read, moves) and runs them
+
+    The actuator is the only stage that touches the WebDriver or the ZoomMeeting's state (history, tracer, outbox,
+    roster). Its actions run one at a time on a single worker thread, and the other stages reach the page and the state
+    by queueing actions for it, including parsing, which updates the history and tracer. An action that fails is
+    printed and its stage carries on. Both queues are bounded, so when the actuator falls
+    behind, parse waits for room on the action queue and ingest in turn waits for room on the line queue
+    """
+
+    def __init__(self, zm, runtime_params, on_metrics=None):
+        self.zm                 = zm
+        self.on_metrics         = on_metrics
+        self.chat_source        = runtime_params["chat_source"]
+        self.N                  = runtime_params["N"]
+        self.ingest_interval    = AdaptiveInterval(runtime_params["ingest_min_interval"],
+                                                   runtime_params["ingest_max_interval"],
+                                                   runtime_params["backoff"])
+        self.help_interval      = runtime_params["help_interval"]
+        self.roster_interval    = runtime_params["roster_interval"]
+        self.staging_interval   = runtime_params["staging_interval"]
+        self.memory_report_interval = runtime_params["memory_report_interval"]
+        self.metrics_interval   = runtime_params["metrics_interval"]
+        self.move_batch_size    = runtime_params["move_batch_size"]
+        self.lines              = asyncio.Queue(runtime_params["line_queue_size"])
+        self.actions            = asyncio.PriorityQueue(runtime_params["action_queue_size"])
+        self.action_count       = itertools.count()  # keeps actions of equal priority in order
+        self.executor           = ThreadPoolExecutor(max_workers=1)
+
+    async def submit(self, priority, fn, *args):
+        """
+        Queues fn(*args) for the actuator
+        :param priority: one of the *_PRIORITY constants
+        :param fn:
+        :param args:
+        :return: future holding the result of fn
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        # The actuator prints failures, so nobody has to await a fire-and-forget action to see them
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        await self.actions.put((priority, next(self.action_count), fn, args, future))
+        return future
+
+    async def call(self, priority, fn, *args):
+        """
+        Queues fn(*args) for the actuator and waits for its result
+        :param priority: one of the *_PRIORITY constants
+        :param fn:
+        :param args:
+        :return: result of fn
+        """
+
+        return await (await self.submit(priority, fn, *args))
+
+    async def actuator(self):
+        """
+        Runs queued actions one at a time on the WebDriver thread
+        :return:
+        """
+
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, fn, args, future = await self.actions.get()
+            try:
+                future.set_result(await loop.run_in_executor(self.executor, fn, *args))
+            except Exception as e:
+                print(f"{fn.__name__} failed: {e}")
+                future.set_exception(e)
+            finally:
+                self.actions.task_done()
+
+    async def ingest(self):
+        """
+        Reads new chat lines and puts them on the line queue
+        :return:
+        """
+
+        while True:
+            try:
+                events = await self.call(READ_PRIORITY, read_chat, self.zm, self.chat_source, self.N)
+            except Exception:
+                events = []
+
+            for event in events:
+                await self.lines.put(event)
+
+            # Replies queued by earlier actions go out as one chat message
+            await self.submit(BROADCAST_PRIORITY, self.zm.flush_chat)
+
+            try:
+                await self.call(READ_PRIORITY, self.end_iteration, bool(events))
+            except Exception:
+                pass
+
+            await asyncio.sleep(self.ingest_interval.next(bool(events)))
+
+    async def help(self):
+        """
+        Closes help windows
+        :return:
+        """
+
+        while True:
+            await self.submit(HELP_PRIORITY, close_help_if_open, self.zm)
+            await asyncio.sleep(self.help_interval)
+
+    async def roster(self):
+        """
+        Keeps the roster index up to date
+        :return:
+        """
+
+        while True:
+            await self.submit(READ_PRIORITY, refresh_roster, self.zm)
+            await asyncio.sleep(self.roster_interval)
+
+    async def staging(self):
+        """
+        Applies staged assignments until breakout rooms are opened
+        :return:
+        """
+
+        while self.zm.staging is not None and not self.zm.staging.opened:
+            try:
+                await self.call(MOVE_PRIORITY, self.zm.run_staging)
+            except Exception:
+                pass
+            await asyncio.sleep(self.staging_interval)
+
+    async def memory(self):
+        """
+        Prints the sizes of the bot's in-memory stores every memory_report_interval seconds
+        :return:
+        """
+
+        while True:
+            await asyncio.sleep(self.memory_report_interval)
+            try:
+                print(f"Memory: {await self.call(READ_PRIORITY, self.zm.memory_report)}")
+            except Exception:
+                pass
+
+    async def metrics(self):
+        """
+        Reports metrics every metrics_interval seconds
+        :return:
+        """
+
+        while self.on_metrics is not None:
+            await asyncio.sleep(self.metrics_interval)
+            try:
+                await self.call(READ_PRIORITY, self.on_metrics, self.zm)
+            except Exception:
+                pass
+
+    def parse_lines(self, events):
+        """
+        Parses chat lines into commands. Runs as an action, as parsing updates the history, tracer and outbox
+        :param events: chat lines from read_chat
+        :return: list of commands, see commands.parse_message
+        """
+
+        return [command for event in events
+                for command in parse_message(self.zm, event["author"], event["line"], event["time"])]
+
+    def end_iteration(self, active):
+        """
+        Exports traces, ends the profiler's iteration and checkpoints. Runs as an action, so that none of them reads
+        state while another action is updating it
+        :param active: True if the chat had new lines
+        :return:
+        """
+
+        self.zm.tracer.maybe_export()
+        if self.zm.profiler is not None:
+            self.zm.profiler.end_iteration()
+        self.zm.maybe_checkpoint(active)
+
+    async def parse(self):
+        """
+        Turns chat lines into broadcast and move actions. Lines waiting on the line queue are parsed together, in one
+        action
+        :return:
+        """
+
+        pending_moves = []
+        while True:
+            events = [await self.lines.get()]
+            while not self.lines.empty() and len(events) < self.move_batch_size:
+                events.append(self.lines.get_nowait())
+
+            try:
+                commands = await self.call(READ_PRIORITY, self.parse_lines, events)
+            except Exception:
+                commands = []
+
+            for command, author, argument in commands:
+                if command == "broadcast":
+                    await self.submit(BROADCAST_PRIORITY, broadcast, self.zm, argument, author)
+                elif command == "move":
+                    pending_moves.append((author, argument))
+
+            if pending_moves and (self.lines.empty() or len(pending_moves) >= self.move_batch_size):
+                await self.submit(MOVE_PRIORITY, make_moves, self.zm, pending_moves)
+                pending_moves = []
+
+    async def run(self):
+        """
+        Runs every stage until one of them fails
+        :return:
+        """
+
+        await asyncio.gather(self.actuator(), self.ingest(), self.help(), self.roster(), self.staging(), self.memory(),
+                             self.metrics(), self.parse())
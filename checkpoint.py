@@ -0,0 +1,46 @@
+"""
+Crash-safe checkpoint of the bot's state, so that a restarted bot can reattach to its Chrome session and carry on from
+where it stopped without re-running setup or handling old chat commands again. The checkpoint is a versioned JSON file
+that is replaced atomically, so a crash mid-write leaves the previous checkpoint intact
+"""
+
+import json
+import time
+from tracing import write_atomically
+
+CHECKPOINT_VERSION = 3
+
+
+def save_checkpoint(path, state):
+    """
+    Writes state to path with the current version and time
+    :param path:
+    :param state: JSON-compatible dict
+    :return:
+    """
+
+    checkpoint = dict(state, version=CHECKPOINT_VERSION, saved=time.time())
+    write_atomically(path, json.dumps(checkpoint, indent=1), sync=True)
+
+
+def load_checkpoint(path):
+    """
+    Reads the checkpoint at path
+    :param path:
+    :return: dict, or None if there is no readable checkpoint of the current version
+    """
+
+    try:
+        with open(path) as handle:
+            checkpoint = json.load(handle)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        print(f"Ignoring checkpoint {path} from version {checkpoint.get('version')}, expected {CHECKPOINT_VERSION}")
+        return None
+
+    return checkpoint
@@ -0,0 +1,119 @@
+"""
+Chat command grammar and room name resolution. Both are built once at startup: the grammar is one precompiled regex that
+splits a chat line into commands in a single pass, and the room index resolves what users type to a room name without
+scanning room_names
+"""
+
+import re
+
+
+class CommandGrammar(object):
+    """
+    Tokenises chat lines of the form "<phrase><argument>", e.g. "AssignMeTo: Cooking". A line may hold several commands,
+    e.g. "AssignMeTo: Cooking Broadcast: Back in 5". Each argument runs until the next command phrase or the end of the
+    line
+    """
+
+    def __init__(self, phrases):
+        """
+        :param phrases: dict of command name -> phrase, e.g. {"move": "AssignMeTo: "}
+        """
+
+        self.commands   = {phrase: command for command, phrase in phrases.items()}
+        alternation     = "|".join(re.escape(phrase) for phrase in sorted(phrases.values(), key=len, reverse=True))
+        self.pattern    = re.compile(f"({alternation})(.*?)(?=(?:{alternation})|$)", re.MULTILINE)
+
+    def parse(self, line):
+        """
+        Returns the commands in line, in the order they appear. Commands with nothing after the phrase, e.g. the
+        "Broadcast: " in "Broadcast: AssignMeTo: Cooking", are dropped
+        :param line:
+        :return: list of (command name, argument) with surrounding whitespace stripped from the argument
+        """
+
+        commands = [(self.commands[phrase], argument.strip()) for phrase, argument in self.pattern.findall(line)]
+        return [(command, argument) for command, argument in commands if argument]
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance between a and b, giving up once it must exceed max_distance
+    :param a:
+    :param b:
+    :param max_distance:
+    :return: distance, or max_distance + 1 if it is larger than max_distance
+    """
+
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return min(previous[-1], max_distance + 1)
+
+
+class RoomIndex(object):
+    """
+    Resolves typed room names to entries of room_names. Matching ignores case and repeated whitespace. A name resolves
+    if it is a room name or a prefix of exactly one room name (e.g. "cook" -> "Cooking"). Names that don't resolve get
+    suggestions within max_distance edits
+    """
+
+    def __init__(self, room_names, max_distance=2):
+        self.room_names     = list(room_names)
+        self.max_distance   = max_distance
+        self.exact          = dict()
+        self.prefixes       = dict()  # folded prefix -> room name, or None if several rooms share the prefix
+
+        for name in self.room_names:
+            folded = self.fold(name)
+            self.exact[folded] = name
+            for end in range(1, len(folded) + 1):
+                prefix = folded[:end]
+                self.prefixes[prefix] = name if self.prefixes.get(prefix, name) == name else None
+
+    @staticmethod
+    def fold(text):
+        """
+        Normalises text for matching
+        :param text:
+        :return: str
+        """
+
+        return " ".join(text.split()).casefold()
+
+    def resolve(self, text):
+        """
+        Returns the room name that text refers to
+        :param text:
+        :return: room name or None
+        """
+
+        folded = self.fold(text)
+        if folded in self.exact:
+            return self.exact[folded]
+        return self.prefixes.get(folded)
+
+    def suggest(self, text, limit=3):
+        """
+        Returns the room names closest to text
+        :param text:
+        :param limit: most suggestions returned
+        :return: list of room names, closest first
+        """
+
+        folded = self.fold(text)
+        scored = []
+        for folded_name, name in self.exact.items():
+            distance = edit_distance(folded, folded_name, self.max_distance)
+            if distance <= self.max_distance:
+                scored.append((distance, name))
+
+        return [name for _, name in sorted(scored)[:limit]]
@@ -0,0 +1,121 @@
+"""
+Chat command handling shared by the main loop in scaroomassign.py and the asyncio runtime in bot_runtime.py. Chat lines
+are parsed into commands, which are then acted on through a ZoomMeeting
+"""
+
+from move_planner import coalesce_moves
+
+
+def read_chat(zm, chat_source, n):
+    """
+    Returns the chat lines posted since the last call
+    :param zm: ZoomMeeting
+    :param chat_source: "observer" or "cursor", see conf.CHAT_SOURCE
+    :param n: number of chat items read per call when chat_source is "cursor"
+    :return: list of dicts with keys "author" and "line", oldest first
+    """
+
+    if chat_source == "cursor":
+        return zm.read_new_chat_lines(n)
+    return zm.drain_chat_events()
+
+
+def parse_message(zm, author, message, seen=None):
+    """
+    Splits a chat line into commands (broadcast phrase and move phrase) and opens a trace for each command found. Move
+    targets are resolved through zm.room_index, so "cook" becomes "Cooking". Targets that don't resolve are kept as
+    typed for move_is_valid to reject. Repeats of a recent command and commands from users over the rate limit are
+    dropped, see history.CommandHistory
+    :param zm: ZoomMeeting
+    :param author:
+    :param message:
+    :param seen: time.time() at which the line appeared in chat, if known
+    :return: list of commands, each ("broadcast", author, message) or ("move", target_user, target_room)
+    """
+
+    commands = []
+
+    for command, argument in zm.grammar.parse(message):
+        if command == "move":
+            argument = zm.room_index.resolve(argument) or argument
+        commands.append((command, author, argument))
+
+    admitted = []
+    for command, user, argument in commands:
+        # Dropped commands get no trace, so that a repeat doesn't replace the trace of the command it repeats
+        status = zm.history.admit(command, user, argument, seen)
+        if status == "ok":
+            zm.tracer.start(command, user, argument, seen)
+            zm.tracer.mark(command, user, "parsed")
+            admitted.append((command, user, argument))
+        elif status == "rate limited":
+            zm.send_message_to_chat(f"{user} - Too many commands. Please wait a minute.")
+
+    return admitted
+
+
+def broadcast(zm, bc_message, author=None, state=None):
+    """
+    Broadcasts bc_message to all rooms unless it has been broadcast before
+    :param zm: ZoomMeeting
+    :param bc_message:
+    :param author: user who asked for the broadcast, used to close their trace
+    :param state: result of zm.ui_state earlier in the same tick, read when needed if None
+    :return:
+    """
+
+    if zm.history.broadcast_seen(bc_message):
+        zm.tracer.finish("broadcast", author, "duplicate")
+        return
+
+    zm.tracer.mark("broadcast", author, "validated")
+    print(f"Broadcasting : {bc_message}")
+
+    if zm.broadcast_message(bc_message, state):
+        zm.tracer.finish("broadcast", author)
+    else:
+        zm.tracer.finish("broadcast", author, "rooms not started")
+
+
+def make_moves(zm, pending_moves, state=None):
+    """
+    Keeps the last move requested by each user, validates them against the in-memory roster index and makes them as a
+    batch. Moves that are invalid or fail are forgotten by zm.history, so that a retry isn't dropped as a repeat
+    :param zm: ZoomMeeting
+    :param pending_moves: list of (target_user, target_room)
+    :param state: result of zm.ui_state earlier in the same tick, read when needed if None
+    :return: dict of target_user -> True if the move was made
+    """
+
+    moves = dict()
+    incoming = dict()  # target_room -> moves into it accepted so far, so that capacity holds across the batch
+
+    for target_user, target_room in coalesce_moves(pending_moves).items():
+        if zm.move_is_valid(target_user, target_room, incoming.get(target_room, 0)):
+            print(f"Moving {target_user} to {target_room}")
+            zm.tracer.mark("move", target_user, "validated")
+            moves[target_user] = target_room
+            incoming[target_room] = incoming.get(target_room, 0) + 1
+        else:
+            zm.tracer.finish("move", target_user, "invalid")
+            zm.history.forget("move", target_user)
+
+    results = zm.move_users_to_rooms(moves, state=state)
+    for target_user, moved in results.items():
+        if not moved:
+            zm.history.forget("move", target_user)
+
+    return results
+
+
+def refresh_roster(zm):
+    """
+    Brings zm.roster up to date and reports moves the bot didn't make, e.g. by hosts or Zoom's self-select
+    :param zm: ZoomMeeting
+    :return: True if anyone joined, left or changed rooms
+    """
+
+    changes = zm.refresh_roster()
+    if changes:
+        print(f"Roster: {len(changes)} changes, room counts {zm.roster.counts()}")
+    return bool(changes)
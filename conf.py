@@ -2,8 +2,10 @@
 Variables for configuration of zoom meetings using SCA Room Assign Tool
 """
 
-N               = 1
-SESSION_PATH    = "session_info.obj"
+N               = 10  # chat items read per loop when CHAT_SOURCE is "cursor"
+CHAT_SOURCE     = "observer"  # "observer" (in-page MutationObserver queue) or "cursor" (polling with N)
+ASYNC_RUNTIME   = False  # True runs the asyncio pipeline in bot_runtime.py instead of the serial main loop
+SESSION_PATH    = "zoombot_checkpoint.json"  # Chrome session, chat position, roster and history, kept for restarts
 CHROME_PATH     = "C:/ChromeDriver/chromedriver.exe"
 
 
@@ -13,11 +15,91 @@ password            = ""
 room_names          = ["Calligraphy", "Costume", "Cooking", "Performance", "Construction", "Other", "Chatroom 1",
                        "Chatroom 2"]
 meeting_docs        = """Bot started. """
+room_manifest       = None  # e.g. "rooms.yaml" or "rooms.csv", see room_manifest.py. Replaces room_names if given
+
+trace_params = {
+    "metrics_path": None,  # e.g. "zoombot.prom" for the Prometheus node exporter's textfile collector
+    "trace_log_path": None,  # e.g. "command_traces.jsonl"
+    "export_interval": 10,  # seconds between writes
+    "window": 1000}  # number of recent commands the percentiles are taken over
+
+profile_params = {
+    "enabled": False,  # True times every WebDriver call. Adds a little overhead to each call
+    "iteration_log_path": "driver_profile.jsonl",  # per-loop summary of WebDriver calls by calling function
+    "folded_path": "driver_profile.folded",  # aggregate in folded-stack format for flame graph tools
+    "report_interval": 60}  # seconds between aggregate reports
+
+setup_params = {
+    "poll_interval": 0.25,  # seconds between checks of which setup steps can run
+    "page_timeout": 60,  # seconds to wait for the meeting page to load
+    "step_timeout": 20,  # seconds each other setup step may take
+    "retries": 2}  # times a setup step is retried after an error
+
+staging_params = {
+    "enabled": False,  # True collects assignments before rooms open and only opens them on the trigger or schedule
+    "attendee_csv": None,  # e.g. "attendees.csv" with columns attendee and room
+    "trigger_path": "open_rooms",  # rooms open once this file exists, e.g. after running "touch open_rooms"
+    "open_at": None}  # or open rooms at this local time, e.g. "18:30"
+
+outbox_params = {
+    "min_interval": 1,  # seconds between the bot's chat posts. Replies queued in between are posted together
+    "max_lines": 20,  # most replies in one post
+    "dedupe_window": 30}  # seconds during which a repeat of the same reply is dropped
+
+history_params = {
+    "broadcast_ttl": 4 * 60 * 60,  # seconds a broadcast message is remembered, to stop it being sent twice
+    "collapse_window": 10,  # seconds during which the same command from the same user is only acted on once
+    "rate_limit": 10,  # most commands a user may give...
+    "rate_window": 60,  # ...in this many seconds
+    "max_size": 10000}  # most entries kept in each history
 
 meeting_params = {
     "room_names": room_names,
+    "room_manifest": room_manifest,
     "SESSION_PATH": SESSION_PATH,
     "CHROME_PATH": CHROME_PATH,
     "username": username,
     "password": password,
-    "meeting_docs": meeting_docs}
+    "meeting_docs": meeting_docs,
+    "trace_params": trace_params,
+    "profile_params": profile_params,
+    "setup_params": setup_params,
+    "staging_params": staging_params,
+    "outbox_params": outbox_params,
+    "history_params": history_params,
+    "record_path": None,  # e.g. "meeting_trace.jsonl" to record chat and roster for replay.py
+    "checkpoint_interval": 5}  # seconds between checkpoints while the chat is quiet
+
+scheduler_params = {
+    "chat_min_interval": 0.1,  # seconds between chat checks just after activity
+    "chat_max_interval": 2,  # seconds between chat checks once the chat has been idle for a while
+    "backoff": 1.5,  # factor the chat interval grows by after each idle check
+    "help_interval": 3,  # seconds between checks for "Ask for Help" windows
+    "roster_interval": 10,  # seconds between full roster reads, which pick up moves made by hosts or self-select
+    "staging_interval": 5,  # seconds between applying staged assignments, see staging_params
+    "memory_report_interval": 3600,  # seconds between reports of the bot's memory use
+    "metrics_interval": 10,  # seconds between metrics sent to orchestrator.py, when run by it
+    "report_interval": 300}  # seconds between scheduler reports
+
+runtime_params = {
+    "chat_source": CHAT_SOURCE,
+    "N": N,
+    "ingest_min_interval": scheduler_params["chat_min_interval"],  # seconds between chat reads after activity
+    "ingest_max_interval": scheduler_params["chat_max_interval"],  # seconds between chat reads when idle
+    "backoff": scheduler_params["backoff"],
+    "help_interval": scheduler_params["help_interval"],
+    "roster_interval": scheduler_params["roster_interval"],
+    "staging_interval": scheduler_params["staging_interval"],
+    "memory_report_interval": scheduler_params["memory_report_interval"],
+    "metrics_interval": scheduler_params["metrics_interval"],
+    "line_queue_size": 500,  # chat lines waiting to be parsed
+    "action_queue_size": 100,  # actions waiting for the WebDriver
+    "move_batch_size": 50}  # most moves made in one batch
+
+orchestrator_params = {
+    "meetings_path": "meetings.json",  # list of meetings for orchestrator.py, see there for the format
+    "max_workers": None,  # most meetings run at once. None uses the number of CPU cores
+    "restart_backoff": 5,  # seconds before a crashed worker is restarted, doubled after each crash in a row...
+    "max_backoff": 300,  # ...up to this many seconds
+    "stable_after": 600,  # seconds a worker must run before its earlier crashes are forgotten
+    "report_interval": 60}  # seconds between combined metrics reports
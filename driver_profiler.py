@@ -0,0 +1,188 @@
+"""
+Opt-in profiler for WebDriver round trips. Every Selenium command (find_element, get_attribute, click, execute_script,
+ActionChains perform, ...) goes through the driver's execute method, including commands sent through WebElements, so
+wrapping that one method sees them all. Each command is recorded with the chain of ZoomBot functions that led to it, its
+duration and whether it sat out the implicit wait
+"""
+
+import os
+import sys
+import json
+import time
+from selenium.common.exceptions import NoSuchElementException
+
+REPO_DIR        = os.path.dirname(os.path.abspath(__file__))
+FIND_COMMANDS   = {"findElement", "findElements", "findChildElement", "findChildElements"}
+
+
+def caller_chain(frame):
+    """
+    Returns the ZoomBot functions on the stack above frame, outermost first, as "module.function" strings. Frames from
+    Selenium, the standard library and this module are left out
+    :param frame:
+    :return: tuple of str
+    """
+
+    chain = []
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(REPO_DIR) and filename != __file__:
+            module = os.path.splitext(os.path.basename(filename))[0]
+            chain.append(f"{module}.{frame.f_code.co_name}")
+        frame = frame.f_back
+
+    return tuple(reversed(chain))
+
+
+class DriverProfiler(object):
+    """
+    Records WebDriver commands, per loop iteration and in aggregate.
+
+    The aggregate is keyed by (caller chain, command) and can be written in the folded-stack format used by flame graph
+    tools (e.g. flamegraph.pl or speedscope), weighted by milliseconds spent waiting on the driver
+    """
+
+    def __init__(self, profile_params=None):
+        profile_params              = profile_params or dict()
+        self.iteration_log_path     = profile_params.get("iteration_log_path")
+        self.folded_path            = profile_params.get("folded_path")
+        self.report_interval        = profile_params.get("report_interval", 60)
+        self.implicit_wait          = 0  # seconds, tracked from the driver's timeout commands
+        self.iteration              = 0
+        self.iteration_calls        = []
+        self.aggregate              = dict()
+        self.last_report            = time.time()
+
+    def profile(self, execute, driver_command, params=None):
+        """
+        Runs execute(driver_command, params) and records it
+        :param execute: the driver's original execute method
+        :param driver_command: Selenium command name, e.g. "findElement"
+        :param params:
+        :return: result of execute
+        """
+
+        self.track_implicit_wait(driver_command, params)
+
+        start = time.perf_counter()
+        not_found = False
+        try:
+            return execute(driver_command, params)
+        except NoSuchElementException:
+            not_found = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            waited = driver_command in FIND_COMMANDS and self.implicit_wait > 0 and \
+                (not_found or duration >= self.implicit_wait)
+            # Skip this frame and ZoomMeeting's execute wrapper that called it
+            self.record(caller_chain(sys._getframe(2)), driver_command, duration, waited)
+
+    def track_implicit_wait(self, driver_command, params):
+        """
+        Keeps self.implicit_wait in step with implicitly_wait calls on the driver
+        :param driver_command:
+        :param params:
+        :return:
+        """
+
+        if not params:
+            return
+        if driver_command == "setTimeouts" and "implicit" in params:
+            self.implicit_wait = params["implicit"] / 1000
+        elif driver_command == "implicitlyWait" and "ms" in params:
+            self.implicit_wait = params["ms"] / 1000
+
+    def record(self, chain, driver_command, duration, waited):
+        """
+        Adds one command to the current iteration and to the aggregate
+        :param chain: result of caller_chain
+        :param driver_command:
+        :param duration: seconds
+        :param waited: True if the command sat out the implicit wait
+        :return:
+        """
+
+        caller = chain[-1] if chain else "<unknown>"
+        self.iteration_calls.append((caller, driver_command, duration, waited))
+
+        key = (chain, driver_command)
+        count, total, waits = self.aggregate.get(key, (0, 0.0, 0))
+        self.aggregate[key] = (count + 1, total + duration, waits + waited)
+
+    def end_iteration(self):
+        """
+        Closes the current loop iteration. Its summary is appended to the iteration log if one is set, and the
+        aggregate report is written every report_interval seconds
+        :return: summary dict of the iteration
+        """
+
+        by_caller = dict()
+        for caller, driver_command, duration, waited in self.iteration_calls:
+            stats = by_caller.setdefault(caller, {"calls": 0, "seconds": 0.0, "implicit_waits": 0, "commands": dict()})
+            stats["calls"] += 1
+            stats["seconds"] += duration
+            stats["implicit_waits"] += waited
+            stats["commands"][driver_command] = stats["commands"].get(driver_command, 0) + 1
+
+        summary = {"iteration": self.iteration,
+                   "time": time.time(),
+                   "calls": len(self.iteration_calls),
+                   "seconds": sum(call[2] for call in self.iteration_calls),
+                   "by_caller": by_caller}
+
+        if self.iteration_log_path is not None and self.iteration_calls:
+            with open(self.iteration_log_path, "a") as handle:
+                handle.write(json.dumps(summary) + "\n")
+
+        self.iteration += 1
+        self.iteration_calls = []
+
+        if time.time() - self.last_report >= self.report_interval:
+            self.write_report()
+
+        return summary
+
+    def folded_stacks(self):
+        """
+        Formats the aggregate as folded stacks, one "frame;frame;command milliseconds" line per caller chain and command
+        :return: str
+        """
+
+        lines = []
+        for (chain, driver_command), (_, total, _) in sorted(self.aggregate.items()):
+            lines.append(";".join(chain + (driver_command,)) + f" {int(round(total * 1000))}")
+
+        return "\n".join(lines) + "\n"
+
+    def report_text(self, top=15):
+        """
+        Lists the ZoomBot functions that made the most expensive WebDriver calls
+        :param top: number of functions listed
+        :return: str
+        """
+
+        by_caller = dict()
+        for (chain, _), (count, total, waits) in self.aggregate.items():
+            caller = chain[-1] if chain else "<unknown>"
+            calls, seconds, implicit_waits = by_caller.get(caller, (0, 0.0, 0))
+            by_caller[caller] = (calls + count, seconds + total, implicit_waits + waits)
+
+        lines = [f"{'caller':<50} {'calls':>8} {'seconds':>9} {'ms/call':>8} {'waits':>6}"]
+        for caller, (calls, seconds, waits) in sorted(by_caller.items(), key=lambda item: -item[1][1])[:top]:
+            lines.append(f"{caller:<50} {calls:>8} {seconds:>9.2f} {seconds / calls * 1000:>8.1f} {waits:>6}")
+
+        return "\n".join(lines)
+
+    def write_report(self):
+        """
+        Prints the report and writes the folded stacks to folded_path if one is set
+        :return:
+        """
+
+        print(self.report_text())
+        if self.folded_path is not None:
+            with open(self.folded_path, "w") as handle:
+                handle.write(self.folded_stacks())
+
+        self.last_report = time.time()
@@ -12,3 +12,7 @@ class RoomIndexNotFoundException(Exception):
 
     def __init__(self, msg):
         print(msg)
+
+
+class SetupFailedException(Exception):
+    pass
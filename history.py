@@ -0,0 +1,260 @@
+"""
+Bounded command and broadcast history. Entries are kept by a short hash of their text, expire after a time to live and
+are evicted oldest first past a maximum size, so memory use stays flat however long the event runs
+"""
+
+import sys
+import time
+import hashlib
+from collections import OrderedDict, deque
+
+
+def digest(*parts):
+    """
+    Returns a short, fixed-size key for parts
+    :param parts: strings
+    :return: str
+    """
+
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=8).hexdigest()
+
+
+class ExpiringSet(object):
+    """
+    Set of keys that each expire ttl seconds after they were last added. Past max_size keys, the oldest are evicted. A
+    key can carry a value, which is kept until the key expires
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl        = ttl
+        self.max_size   = max_size
+        self.entries    = OrderedDict()  # key -> time.time() it was added, oldest first
+        self.values     = dict()  # key -> value, for keys added with one
+        self.evicted    = 0
+
+    def add(self, key, now=None, value=None):
+        """
+        Adds key, or renews it if it is already present
+        :param key:
+        :param now:
+        :param value: replaces the key's value, if given
+        :return:
+        """
+
+        now = time.time() if now is None else now
+        self.entries[key] = now
+        self.entries.move_to_end(key)
+        if value is not None:
+            self.values[key] = value
+        self.expire(now)
+
+    def contains(self, key, now=None):
+        """
+        Returns True if key was added less than ttl seconds ago
+        :param key:
+        :param now:
+        :return:
+        """
+
+        added = self.entries.get(key)
+        if added is None:
+            return False
+        now = time.time() if now is None else now
+        return now - added < self.ttl
+
+    def get(self, key, now=None):
+        """
+        Returns the value of key if it was added less than ttl seconds ago
+        :param key:
+        :param now:
+        :return: value, or None
+        """
+
+        return self.values.get(key) if self.contains(key, now) else None
+
+    def discard(self, key):
+        """
+        Removes key if it is present
+        :param key:
+        :return:
+        """
+
+        self.entries.pop(key, None)
+        self.values.pop(key, None)
+
+    def expire(self, now):
+        """
+        Drops expired keys and, past max_size, the oldest keys
+        :param now:
+        :return:
+        """
+
+        while self.entries:
+            key, added = next(iter(self.entries.items()))
+            if now - added < self.ttl and len(self.entries) <= self.max_size:
+                break
+            del self.entries[key]
+            self.values.pop(key, None)
+            self.evicted += 1
+
+    def size_bytes(self):
+        """
+        Returns an estimate of the memory held by the set
+        :return: int
+        """
+
+        return sys.getsizeof(self.entries) + sys.getsizeof(self.values) + \
+            sum(sys.getsizeof(key) + sys.getsizeof(added) + sys.getsizeof(self.values.get(key))
+                for key, added in self.entries.items())
+
+
+class RateLimiter(object):
+    """
+    Allows each user at most max_count actions in any window seconds
+    """
+
+    def __init__(self, max_count, window):
+        self.max_count  = max_count
+        self.window     = window
+        self.times      = dict()  # user -> deque of time.time() of recent actions
+        self.limited    = 0
+
+    def allow(self, user, now=None):
+        """
+        Records an action by user if they are under the limit
+        :param user:
+        :param now:
+        :return: True if the action is allowed
+        """
+
+        now = time.time() if now is None else now
+        times = self.times.setdefault(user, deque())
+        while times and now - times[0] >= self.window:
+            times.popleft()
+
+        if len(times) >= self.max_count:
+            self.limited += 1
+            return False
+
+        times.append(now)
+        return True
+
+    def prune(self, now=None):
+        """
+        Forgets users with no actions in the current window
+        :param now:
+        :return:
+        """
+
+        now = time.time() if now is None else now
+        self.times = {user: times for user, times in self.times.items() if times and now - times[-1] < self.window}
+
+
+class CommandHistory(object):
+    """
+    Per-meeting history used to drop repeated work:
+    - broadcasts: messages already broadcast, kept for broadcast_ttl seconds
+    - commands: the last command of each kind from each user, with its argument, if handled in the last collapse_window
+      seconds. The same command with the same argument within the window is a repeat and is collapsed into the first
+      one. A different argument (e.g. a move to another room, then back) is never a repeat. A command that failed is
+      forgotten, so that the user can retry it straight away
+    - a per-user rate limit of rate_limit commands every rate_window seconds
+    """
+
+    def __init__(self, history_params=None):
+        history_params  = history_params or dict()
+        max_size        = history_params.get("max_size", 10000)
+        self.broadcasts = ExpiringSet(history_params.get("broadcast_ttl", 4 * 60 * 60), max_size)
+        self.commands   = ExpiringSet(history_params.get("collapse_window", 10), max_size)
+        self.rate       = RateLimiter(history_params.get("rate_limit", 10), history_params.get("rate_window", 60))
+        self.repeats    = 0
+
+    def broadcast_seen(self, message):
+        """
+        Returns True if message has been broadcast within broadcast_ttl
+        :param message:
+        :return:
+        """
+
+        return self.broadcasts.contains(digest(message))
+
+    def add_broadcast(self, message):
+        """
+        Records that message was broadcast
+        :param message:
+        :return:
+        """
+
+        self.broadcasts.add(digest(message))
+
+    def admit(self, command, user, argument, now=None):
+        """
+        Decides whether a command should be acted on
+        :param command:
+        :param user:
+        :param argument:
+        :param now: time.time() at which the command was given, if known, so that windows are measured between
+            commands rather than between the times they were handled
+        :return: "ok", "repeat" or "rate limited"
+        """
+
+        now = time.time() if now is None else now
+        key = digest(command, user)
+        if self.commands.get(key, now) == digest(argument):
+            self.repeats += 1
+            return "repeat"
+        if not self.rate.allow(user, now):
+            return "rate limited"
+
+        self.commands.add(key, now, digest(argument))
+        return "ok"
+
+    def forget(self, command, user):
+        """
+        Forgets the last command of this kind from user, e.g. after it failed, so that a retry isn't a repeat
+        :param command:
+        :param user:
+        :return:
+        """
+
+        self.commands.discard(digest(command, user))
+
+    def memory(self):
+        """
+        Returns entry counts, eviction counts and estimated memory use
+        :return: dict
+        """
+
+        self.rate.prune()
+        return {"broadcasts": len(self.broadcasts.entries),
+                "commands": len(self.commands.entries),
+                "rate_limited_users": len(self.rate.times),
+                "evicted": self.broadcasts.evicted + self.commands.evicted,
+                "repeats": self.repeats,
+                "rate_limited": self.rate.limited,
+                "bytes": self.broadcasts.size_bytes() + self.commands.size_bytes() + sys.getsizeof(self.rate.times)}
+
+    def state(self):
+        """
+        Returns the history in a JSON-compatible form for checkpointing
+        :return: dict
+        """
+
+        return {"broadcasts": list(self.broadcasts.entries.items()),
+                "commands": [(key, added, self.commands.values.get(key))
+                             for key, added in self.commands.entries.items()]}
+
+    def restore(self, state):
+        """
+        Restores the history saved by state
+        :param state:
+        :return:
+        """
+
+        now = time.time()
+        for key, added in state.get("broadcasts", []):
+            self.broadcasts.add(key, added)
+        for key, added, value in state.get("commands", []):
+            self.commands.add(key, added, value)
+        self.broadcasts.expire(now)
+        self.commands.expire(now)
@@ -0,0 +1,90 @@
+"""
+Cache of WebElement handles for parts of the Zoom page that stay put for long stretches, such as the chat textarea and
+the breakout room list. Handles are keyed by (By, selector) and reused until they go stale, expire or are invalidated
+"""
+
+import time
+from selenium.common.exceptions import StaleElementReferenceException
+
+
+class LocatorCache(object):
+    """
+    Caches find_element results. Use with_element to act on a cached element: if the handle has gone stale, it is looked
+    up again and the action retried once.
+
+    Call invalidate() after actions that are known to rebuild the DOM, e.g. starting breakout rooms
+    """
+
+    def __init__(self, get_driver, ttl=60):
+        self.get_driver = get_driver
+        self.ttl        = ttl
+        self.entries    = dict()  # (by, selector) -> (element, time found)
+        self.hits       = 0
+        self.misses     = 0
+        self.stale      = 0
+
+    def get(self, by_tag, link_tag, ttl=None):
+        """
+        Returns the element for (by_tag, link_tag), from the cache if it was found less than ttl seconds ago
+        :param by_tag:
+        :param link_tag:
+        :param ttl: seconds, defaults to self.ttl
+        :return: WebElement
+        """
+
+        if ttl is None:
+            ttl = self.ttl
+
+        key = (by_tag, link_tag)
+        entry = self.entries.get(key)
+        if entry is not None and time.time() - entry[1] < ttl:
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        elem = self.get_driver().find_element(by_tag, link_tag)
+        self.entries[key] = (elem, time.time())
+        return elem
+
+    def with_element(self, by_tag, link_tag, fn, *args):
+        """
+        Calls fn(element, *args) on the cached element, looking the element up again if it has gone stale
+        :param by_tag:
+        :param link_tag:
+        :param fn:
+        :param args:
+        :return: result of fn
+        """
+
+        try:
+            return fn(self.get(by_tag, link_tag), *args)
+        except StaleElementReferenceException:
+            self.stale += 1
+            self.entries.pop((by_tag, link_tag), None)
+            return fn(self.get(by_tag, link_tag), *args)
+
+    def invalidate(self, by_tag=None, link_tag=None):
+        """
+        Drops one entry, or every entry if no locator is given
+        :param by_tag:
+        :param link_tag:
+        :return:
+        """
+
+        if by_tag is None:
+            self.entries.clear()
+        else:
+            self.entries.pop((by_tag, link_tag), None)
+
+    def stats(self):
+        """
+        Returns hit, miss and stale counts
+        :return: dict
+        """
+
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries)}
@@ -0,0 +1,79 @@
+"""
+Planning for batches of breakout room moves. A tick's worth of AssignMeTo commands is coalesced to one move per user and
+planned against a single roster snapshot
+"""
+
+
+def coalesce_moves(commands):
+    """
+    Keeps only the last requested room for each user
+    :param commands: iterable of (target_user, target_room) in the order they were received
+    :return: dict of target_user -> target_room
+    """
+
+    moves = dict()
+    for target_user, target_room in commands:
+        moves.pop(target_user, None)  # re-insert so the dict stays in order of each user's latest command
+        moves[target_user] = target_room
+
+    return moves
+
+
+def locate_users(snapshot):
+    """
+    Inverts a roster snapshot
+    :param snapshot: result of ZoomMeeting.roster_snapshot
+    :return: dict of user name -> room name
+    """
+
+    locations = dict()
+    for room_name, room in snapshot.items():
+        for user in room["attendees"]:
+            locations[user] = room_name
+
+    return locations
+
+
+def plan_moves(moves, snapshot):
+    """
+    Groups moves by the room each user is currently in. Each move finds its attendee by name, so the order of the moves
+    doesn't matter
+    :param moves: dict of target_user -> target_room
+    :param snapshot: result of ZoomMeeting.roster_snapshot
+    :return: (groups, already_there, missing) where groups is a list of (source_room, [(target_user, target_room),
+        ...]), already_there lists users who are in their target room and missing lists users who were not found in any
+        room
+    """
+
+    locations       = locate_users(snapshot)
+    by_source       = dict()
+    already_there   = []
+    missing         = []
+
+    for target_user, target_room in moves.items():
+        if target_user not in locations:
+            missing.append(target_user)
+            continue
+
+        source_room = locations[target_user]
+        if source_room == target_room:
+            already_there.append(target_user)
+            continue
+
+        by_source.setdefault(source_room, []).append((target_user, target_room))
+
+    return list(by_source.items()), already_there, missing
+
+
+def group_by_target(moves):
+    """
+    Groups moves by target room, for assigning users before breakout rooms are opened
+    :param moves: dict of target_user -> target_room
+    :return: dict of target_room -> [target_user, ...]
+    """
+
+    by_target = dict()
+    for target_user, target_room in moves.items():
+        by_target.setdefault(target_room, []).append(target_user)
+
+    return by_target
@@ -0,0 +1,367 @@
+"""
+Runs the ZoomBot for several meetings at once, e.g. the parallel tracks of one event. Each meeting gets its own worker
+process with its own Chrome, checkpoint file, trace files and log, so a crash in one meeting doesn't affect the others
+
+Usage:
+python orchestrator.py [meetings.json]
+
+The meetings file is a JSON list (or YAML, which needs PyYAML, if it ends in .yaml or .yml) with one entry per meeting:
+
+[{"name": "track-a", "existing_meeting_id": "860 1959 8282", "room_names": ["Cooking", "Costume"]},
+ {"name": "track-b", "username": "host-b@example.com", "password": "...", "staging_params": {"enabled": true}}]
+
+name is required and is used in file names. existing_meeting_id, chat_source, N and async_runtime default to the values
+in conf.py. Every other key overrides the entry of the same name in conf.meeting_params, and dict values such as
+staging_params are merged into the conf.py dict. Files the bot writes (SESSION_PATH, record_path, the staging trigger
+and the trace and profile files) are prefixed with the meeting name unless given, and each worker's output goes to
+<name>.log.
+
+Crashed workers are restarted with exponential backoff and resume from their checkpoint. At most max_workers meetings
+run at once (by default one per CPU core). Workers report their finished commands and latencies every metrics_interval
+seconds, and a combined report is printed every report_interval seconds, see conf.orchestrator_params
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import multiprocessing
+from tracing import percentile, QUANTILES
+from conf import meeting_params, existing_meeting_id, N, CHAT_SOURCE, ASYNC_RUNTIME, orchestrator_params
+
+# Files each worker writes, as (meeting_params section or None for top level, key)
+OUTPUT_PATHS = [(None, "SESSION_PATH"),
+                (None, "record_path"),
+                ("staging_params", "trigger_path"),
+                ("trace_params", "metrics_path"),
+                ("trace_params", "trace_log_path"),
+                ("profile_params", "iteration_log_path"),
+                ("profile_params", "folded_path")]
+
+
+def prefixed(name, path):
+    """
+    Returns path with name prefixed to its file name
+    :param name:
+    :param path:
+    :return:
+    """
+
+    head, tail = os.path.split(path)
+    return os.path.join(head, f"{name}_{tail}")
+
+
+def meeting_config(entry, where):
+    """
+    Builds a worker's configuration from an entry of the meetings file
+    :param entry: dict
+    :param where: entry's position, used in error messages
+    :return: dict with keys "name", "existing_meeting_id", "chat_source", "N", "async_runtime", "meeting_params" and
+        "log_path"
+    """
+
+    if not isinstance(entry, dict):
+        raise ValueError(f"Meeting {where} is not a mapping: {entry!r}")
+
+    entry = dict(entry)
+    name = str(entry.pop("name", "")).strip()
+    if not re.fullmatch(r"[\w.-]+", name):
+        raise ValueError(f"Meeting {where} needs a name made of letters, digits, '.', '-' or '_', got {name!r}")
+
+    config = {"name": name,
+              "existing_meeting_id": entry.pop("existing_meeting_id", existing_meeting_id),
+              "chat_source": entry.pop("chat_source", CHAT_SOURCE),
+              "N": entry.pop("N", N),
+              "async_runtime": entry.pop("async_runtime", ASYNC_RUNTIME),
+              "log_path": entry.pop("log_path", f"{name}.log")}
+
+    params = dict(meeting_params)
+    for key, value in entry.items():
+        if key not in params:
+            raise ValueError(f"Meeting {name} has an unknown setting: {key}")
+        if isinstance(value, dict) and isinstance(params[key], dict):
+            value = dict(params[key], **value)
+        params[key] = value
+
+    for section, key in OUTPUT_PATHS:
+        given = entry if section is None else entry.get(section) or dict()
+        target = params if section is None else params.get(section)
+        if target is None or key in given or target.get(key) is None:
+            continue
+        if section is not None:
+            target = params[section] = dict(target)
+        target[key] = prefixed(name, target[key])
+
+    config["meeting_params"] = params
+    return config
+
+
+def load_meetings(path):
+    """
+    Reads the meetings file
+    :param path:
+    :return: list of worker configurations, see meeting_config
+    """
+
+    with open(path) as handle:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Reading a YAML meetings file needs PyYAML (pip install pyyaml), or use JSON")
+            entries = yaml.safe_load(handle) or []
+        else:
+            entries = json.load(handle)
+
+    if isinstance(entries, dict):
+        entries = entries.get("meetings", [])
+    meetings = [meeting_config(entry, f"{i + 1} of {path}") for i, entry in enumerate(entries)]
+
+    names = [meeting["name"] for meeting in meetings]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Meetings listed more than once in {path}: {duplicates}")
+
+    if not meetings:
+        raise ValueError(f"No meetings in {path}")
+
+    return meetings
+
+
+def run_worker(meeting, metrics_queue):
+    """
+    Worker process entry point. Runs the ZoomBot for one meeting, with output going to the meeting's log
+    :param meeting: result of meeting_config
+    :param metrics_queue: multiprocessing queue the worker's metrics are put on
+    :return:
+    """
+
+    sys.stdout = sys.stderr = open(meeting["log_path"], "a", buffering=1)
+    print(f"Worker for {meeting['name']} started at {time.ctime()}, pid {os.getpid()}")
+
+    def publish(zm):
+        try:
+            metrics_queue.put_nowait({"name": meeting["name"],
+                                      "pid": os.getpid(),
+                                      "time": time.time(),
+                                      "finished": sum(zm.tracer.finished_counts.values()),
+                                      "webdriver_calls": zm.webdriver_calls,
+                                      "latencies": list(zm.tracer.latencies["total"])})
+        except queue.Full:
+            pass
+
+    # Imported here so that the supervisor doesn't load selenium
+    from scaroomassign import run_bot
+    run_bot(meeting["meeting_params"], meeting["existing_meeting_id"], meeting["chat_source"], meeting["N"],
+            meeting["async_runtime"], on_metrics=publish)
+
+
+class Orchestrator(object):
+    """
+    Supervises one worker process per meeting.
+
+    A worker is pending until a slot is free, then running. A worker that exits cleanly is done. One that crashes waits
+    restart_backoff seconds, doubled for each crash in a row up to max_backoff, and is then started again. A worker that
+    ran for stable_after seconds before crashing starts again from restart_backoff
+    """
+
+    def __init__(self, meetings, orchestrator_params):
+        self.max_workers        = orchestrator_params.get("max_workers") or os.cpu_count() or 1
+        self.restart_backoff    = orchestrator_params.get("restart_backoff", 5)
+        self.max_backoff        = orchestrator_params.get("max_backoff", 300)
+        self.stable_after       = orchestrator_params.get("stable_after", 600)
+        self.report_interval    = orchestrator_params.get("report_interval", 60)
+        self.context            = multiprocessing.get_context("spawn")  # workers don't inherit the supervisor's state
+        self.metrics_queue      = self.context.Queue(1000)
+        self.workers            = [{"meeting": meeting,
+                                    "name": meeting["name"],
+                                    "state": "pending",
+                                    "process": None,
+                                    "started": None,
+                                    "due": 0.0,
+                                    "failures": 0,
+                                    "restarts": 0,
+                                    "metrics": None,
+                                    "finished_before": 0,  # commands finished by earlier processes of this worker
+                                    "reported_finished": 0} for meeting in meetings]
+        self.last_report        = time.time()
+
+        if len(self.workers) > self.max_workers:
+            print(f"Only {self.max_workers} of {len(self.workers)} meetings will run at once")
+
+    def start(self, worker):
+        """
+        Starts a worker process
+        :param worker:
+        :return:
+        """
+
+        worker["process"] = self.context.Process(target=run_worker, args=(worker["meeting"], self.metrics_queue),
+                                                 name=f"zoombot-{worker['name']}")
+        worker["process"].start()
+        worker["state"] = "running"
+        worker["started"] = time.time()
+        print(f"Started {worker['name']} (pid {worker['process'].pid})")
+
+    def collect(self, timeout):
+        """
+        Waits up to timeout seconds for metrics from the workers and stores everything that has arrived
+        :param timeout:
+        :return:
+        """
+
+        try:
+            metrics = self.metrics_queue.get(timeout=timeout)
+            while True:
+                for worker in self.workers:
+                    process = worker["process"]
+                    if worker["name"] == metrics["name"] and process is not None and process.pid == metrics["pid"]:
+                        worker["metrics"] = metrics
+                metrics = self.metrics_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def reap(self, now):
+        """
+        Handles workers that have exited
+        :param now:
+        :return:
+        """
+
+        for worker in self.workers:
+            process = worker["process"]
+            if worker["state"] != "running" or process.is_alive():
+                continue
+
+            process.join()
+            if worker["metrics"] is not None:
+                worker["finished_before"] += worker["metrics"]["finished"]
+                worker["metrics"] = None
+
+            if process.exitcode == 0:
+                worker["state"] = "done"
+                print(f"{worker['name']} finished")
+                continue
+
+            if now - worker["started"] >= self.stable_after:
+                worker["failures"] = 0
+            worker["failures"] += 1
+            delay = min(self.restart_backoff * 2 ** (worker["failures"] - 1), self.max_backoff)
+            worker["state"] = "waiting"
+            worker["due"] = now + delay
+            print(f"{worker['name']} exited with code {process.exitcode}, restarting in {delay:g}s. "
+                  f"See {worker['meeting']['log_path']}")
+
+    def start_due(self, now):
+        """
+        Starts pending workers and crashed workers whose backoff is over, while there are free slots
+        :param now:
+        :return:
+        """
+
+        running = sum(worker["state"] == "running" for worker in self.workers)
+        for worker in self.workers:
+            if running >= self.max_workers:
+                break
+            if worker["state"] in ("pending", "waiting") and worker["due"] <= now:
+                if worker["state"] == "waiting":
+                    worker["restarts"] += 1
+                self.start(worker)
+                running += 1
+
+    def stats(self):
+        """
+        Returns each worker's state, throughput since the last call and latency, and the same combined over all workers.
+        Latency percentiles are taken over the pooled recent commands of every running worker
+        :return: dict
+        """
+
+        now = time.time()
+        elapsed = max(now - self.last_report, 1e-9)
+        self.last_report = now
+
+        workers = dict()
+        pooled = []
+        for worker in self.workers:
+            metrics = worker["metrics"] or {"finished": 0, "webdriver_calls": 0, "latencies": []}
+            finished = worker["finished_before"] + metrics["finished"]
+            latencies = sorted(metrics["latencies"])
+            pooled += latencies
+
+            workers[worker["name"]] = {"state": worker["state"],
+                                       "restarts": worker["restarts"],
+                                       "finished": finished,
+                                       "commands_per_second": (finished - worker["reported_finished"]) / elapsed,
+                                       "webdriver_calls": metrics["webdriver_calls"],
+                                       "latency": {q: percentile(latencies, q) for q in QUANTILES}}
+            worker["reported_finished"] = finished
+
+        pooled.sort()
+        return {"workers": workers,
+                "total": {"finished": sum(stats["finished"] for stats in workers.values()),
+                          "commands_per_second": sum(stats["commands_per_second"] for stats in workers.values()),
+                          "webdriver_calls": sum(stats["webdriver_calls"] for stats in workers.values()),
+                          "latency": {q: percentile(pooled, q) for q in QUANTILES}}}
+
+    def report(self):
+        """
+        Formats stats() for printing
+        :return: str
+        """
+
+        def latency(stats):
+            return " ".join(f"p{q * 100:g} {value:.2f}s" for q, value in stats["latency"].items()
+                            if value is not None) or "no commands yet"
+
+        stats = self.stats()
+        lines = [f"Orchestrator: {len(self.workers)} meetings, "
+                 f"{sum(worker['state'] == 'running' for worker in self.workers)} running"]
+        for name, worker in stats["workers"].items():
+            lines.append(f"  {name}: {worker['state']}, {worker['restarts']} restarts, {worker['finished']} commands, "
+                         f"{worker['commands_per_second']:.2f} commands/s, "
+                         f"{worker['webdriver_calls']} WebDriver calls, {latency(worker)}")
+        total = stats["total"]
+        lines.append(f"  total: {total['finished']} commands, {total['commands_per_second']:.2f} commands/s, "
+                     f"{total['webdriver_calls']} WebDriver calls, {latency(total)}")
+        return "\n".join(lines)
+
+    def run(self, poll_interval=1):
+        """
+        Supervises the workers until every one of them is done or the orchestrator is interrupted
+        :param poll_interval: seconds between checks on the workers
+        :return:
+        """
+
+        try:
+            while any(worker["state"] != "done" for worker in self.workers):
+                now = time.time()
+                self.reap(now)
+                self.start_due(now)
+                self.collect(poll_interval)
+
+                if time.time() - self.last_report >= self.report_interval:
+                    print(self.report())
+        finally:
+            self.stop()
+            print(self.report())
+
+    def stop(self):
+        """
+        Stops every running worker. Their checkpoints let them resume when the orchestrator is started again
+        :return:
+        """
+
+        for worker in self.workers:
+            process = worker["process"]
+            if worker["state"] == "running" and process.is_alive():
+                process.terminate()
+        for worker in self.workers:
+            if worker["process"] is not None:
+                worker["process"].join()
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else orchestrator_params["meetings_path"]
+    Orchestrator(load_meetings(path), orchestrator_params).run()
@@ -0,0 +1,97 @@
+"""
+Outbound chat queue for the bot's replies. Replies are queued as they come up and posted together once per tick, so a
+rush of commands produces one multi-line chat post rather than dozens of typed messages
+"""
+
+import time
+
+
+class ChatOutbox(object):
+    """
+    Queue of chat lines waiting to be posted.
+
+    take() hands out up to max_lines queued lines for one post and is allowed at most once every min_interval seconds.
+    A line that is the same as one queued less than dedupe_window seconds ago is dropped. A line may itself hold several
+    lines of text, e.g. a help request, and stays one entry throughout.
+
+    Times come from clock, time.time by default. replay.py sets it to the recorded time so that a replay posts the same
+    replies however fast it runs.
+
+    The outbox is not thread-safe. In bot_runtime.py it is only used from the actuator thread
+    """
+
+    def __init__(self, outbox_params=None, clock=time.time):
+        outbox_params       = outbox_params or dict()
+        self.clock          = clock
+        self.min_interval   = outbox_params.get("min_interval", 1)
+        self.max_lines      = outbox_params.get("max_lines", 20)
+        self.dedupe_window  = outbox_params.get("dedupe_window", 30)
+        self.lines          = []
+        self.recent         = dict()  # line -> clock() time it was last queued
+        self.last_post      = 0
+        self.queued         = 0
+        self.dropped        = 0
+        self.requeued       = 0
+        self.posts          = 0
+
+    def add(self, line):
+        """
+        Queues line unless it was queued within the dedupe window
+        :param line:
+        :return: True if the line was queued
+        """
+
+        now = self.clock()
+        if now - self.recent.get(line, -self.dedupe_window) < self.dedupe_window:
+            self.dropped += 1
+            return False
+
+        if len(self.recent) > 1000:
+            self.recent = {text: seen for text, seen in self.recent.items() if now - seen < self.dedupe_window}
+
+        self.recent[line] = now
+        self.lines.append(line)
+        self.queued += 1
+        return True
+
+    def ready(self, force=False):
+        """
+        Returns True if there is something to post and the rate limit allows a post now
+        :param force: ignore the rate limit
+        :return:
+        """
+
+        return bool(self.lines) and (force or self.clock() - self.last_post >= self.min_interval)
+
+    def take(self):
+        """
+        Removes up to max_lines lines from the queue
+        :return: list of lines, oldest first
+        """
+
+        lines = self.lines[:self.max_lines]
+        del self.lines[:self.max_lines]
+        self.last_post = self.clock()
+        self.posts += 1
+        return lines
+
+    def requeue(self, lines):
+        """
+        Puts lines from take() back at the front of the queue, e.g. after the chat turned out to be closed
+        :param lines:
+        :return:
+        """
+
+        self.lines[:0] = lines
+        self.posts -= 1
+        self.requeued += len(lines)
+
+    def stats(self):
+        """
+        Returns counts of lines queued, dropped as duplicates, put back after a failed post and waiting, of posts made
+        and of lines remembered for deduplication
+        :return: dict
+        """
+
+        return {"queued": self.queued, "dropped": self.dropped, "requeued": self.requeued, "waiting": len(self.lines),
+                "posts": self.posts, "recent": len(self.recent)}
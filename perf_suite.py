@@ -0,0 +1,288 @@
+"""
+Performance regression suite. Generates a burst of move commands (with typos and duplicates) for a meeting of a given
+size, runs the main loop's command handling until every valid move is made, and reports commands per second, p95 move
+latency, WebDriver calls per command and peak RSS
+
+Usage:
+python perf_suite.py run [--backend fake|sim] [--attendees 1000] [--rooms 40] [--commands 300] [--typos 0.1]
+                         [--duplicates 0.1] [--repeats 5] [--save baseline.json]
+python perf_suite.py compare baseline.json [--threshold 0.2] [--save current.json]
+
+The "fake" backend (default) uses the FakeDriver from replay.py and needs no browser. The "sim" backend runs the
+local Zoom simulator in headless Chrome, see simulate.py. A scenario is run --repeats times and the median of each
+metric is reported, as a single run of the default scenario is too short to time steadily. compare re-runs the
+baseline's scenario on the same backend and exits with status 1 if any metric is worse than the baseline by more than
+the threshold (a fraction), or if any move was missed in any run
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from command_grammar import RoomIndex
+from tracing import percentile
+from simulate import new_sim_driver, new_sim_meeting
+from replay import new_fake_meeting
+from scaroomassign import check_chat
+from conf import meeting_params, N
+
+# Metric -> whether higher values are better
+METRICS = {"commands_per_second": True,
+           "p95_latency": False,
+           "calls_per_command": False,
+           "peak_rss_kb": False}
+
+
+def generate_load(n_attendees, n_rooms, n_commands, typo_rate=0.1, duplicate_rate=0.1, seed=0):
+    """
+    Generates a meeting and a burst of move commands. Each command comes from a different attendee. With probability
+    typo_rate the room name has a character dropped, and with probability duplicate_rate the command is sent twice
+    :param n_attendees:
+    :param n_rooms:
+    :param n_commands: at most n_attendees
+    :param typo_rate:
+    :param duplicate_rate:
+    :param seed:
+    :return: (room names, attendee names, chat lines as [author, line], expected final room of each attendee who asked
+        for a valid room)
+    """
+
+    rng = random.Random(seed)
+    room_names = [f"Room {i + 1:02d}" for i in range(n_rooms)]
+    names = [f"Attendee {i:04d}" for i in range(n_attendees)]
+    room_index = RoomIndex(room_names)
+
+    lines = []
+    expected = dict()
+    for name in rng.sample(names, min(n_commands, n_attendees)):
+        room = rng.choice(room_names)
+        typed = room
+        if rng.random() < typo_rate:
+            i = rng.randrange(len(room))
+            typed = room[:i] + room[i + 1:]
+
+        lines.append([name, f"AssignMeTo: {typed}"])
+        if rng.random() < duplicate_rate:
+            lines.append([name, f"AssignMeTo: {typed}"])
+
+        resolved = room_index.resolve(typed)
+        if resolved is not None:
+            expected[name] = resolved
+
+    return room_names, names, lines, expected
+
+
+class FakeBackend(object):
+    """
+    Meeting on a FakeDriver
+    """
+
+    def __init__(self, room_names):
+        self.zm, self.fake = new_fake_meeting(dict(meeting_params, room_names=room_names))
+
+    def add_attendees(self, names):
+        self.fake.set_rooms({"Unassigned": names})
+        self.zm.refresh_roster()
+
+    def post(self, lines):
+        self.fake.post_chat([{"author": author, "line": line, "time": time.time()} for author, line in lines])
+
+    def locations(self, names):
+        return [self.fake.location(name) for name in names]
+
+    def close(self):
+        pass
+
+
+class SimBackend(object):
+    """
+    Meeting on the Zoom simulator in headless Chrome
+    """
+
+    def __init__(self, room_names):
+        self.driver = new_sim_driver()
+        self.zm = new_sim_meeting(self.driver, room_names)
+
+    def add_attendees(self, names):
+        self.driver.execute_script("zoomSim.addParticipants(arguments[0]); zoomSim.startRooms();", names)
+        self.zm.refresh_roster()
+
+    def post(self, lines):
+        self.driver.execute_script("zoomSim.postChatBatch(arguments[0])", lines)
+
+    def locations(self, names):
+        return self.driver.execute_script("return zoomSim.locationsOf(arguments[0])", names)
+
+    def close(self):
+        self.driver.quit()
+
+
+BACKENDS = {"fake": FakeBackend, "sim": SimBackend}
+
+
+def peak_rss_kb():
+    """
+    Returns the peak resident set size of this process. The browser's memory is not included
+    :return: int, or None where the resource module is not available
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_scenario(scenario):
+    """
+    Runs one load scenario
+    :param scenario: dict with keys "backend", "attendees", "rooms", "commands", "typos", "duplicates", "seed" and
+        "timeout"
+    :return: dict of results
+    """
+
+    room_names, names, lines, expected = generate_load(scenario["attendees"], scenario["rooms"], scenario["commands"],
+                                                       scenario["typos"], scenario["duplicates"], scenario["seed"])
+    backend = BACKENDS[scenario["backend"]](room_names)
+    zm = backend.zm
+    targets = list(expected)
+
+    try:
+        backend.add_attendees(names)
+        start = time.perf_counter()
+        backend.post(lines)
+
+        latencies = dict()
+        calls = 0
+        ticks = 0
+        idle_ticks = 0
+
+        while len(latencies) < len(expected) and time.perf_counter() - start < scenario["timeout"]:
+            before = zm.webdriver_calls
+            check_chat(zm, "observer", N)
+            calls += zm.webdriver_calls - before
+            ticks += 1
+
+            now = time.perf_counter() - start
+            moved = len(latencies)
+            for name, location in zip(targets, backend.locations(targets)):
+                if location == expected[name] and name not in latencies:
+                    latencies[name] = now
+
+            # Stop if moves have stalled, e.g. because a regression loses commands
+            idle_ticks = 0 if len(latencies) > moved else idle_ticks + 1
+            if idle_ticks >= 50:
+                break
+
+        elapsed = time.perf_counter() - start
+    finally:
+        backend.close()
+
+    return {"commands": len(lines),
+            "moves_expected": len(expected),
+            "moved": len(latencies),
+            "ticks": ticks,
+            "seconds": elapsed,
+            "commands_per_second": len(lines) / elapsed if elapsed else 0.0,
+            "p95_latency": percentile(sorted(latencies.values()), 0.95),
+            "calls_per_command": calls / len(lines) if lines else 0.0,
+            "peak_rss_kb": peak_rss_kb()}
+
+
+def run_repeated(scenario):
+    """
+    Runs a load scenario scenario["repeats"] times
+    :param scenario: dict as for run_scenario, with the number of runs under "repeats" (1 if missing)
+    :return: dict of results, each the median over the runs, except "moved", which is the fewest moves made in any run
+    """
+
+    runs = [run_scenario(scenario) for _ in range(scenario.get("repeats", 1))]
+
+    results = dict()
+    for key in runs[0]:
+        values = [run[key] for run in runs if run[key] is not None]
+        results[key] = statistics.median(values) if values else None
+    results["moved"] = min(run["moved"] for run in runs)
+    results["runs"] = len(runs)
+    return results
+
+
+def compare(baseline, current, threshold):
+    """
+    Compares results against a baseline
+    :param baseline: results dict from run_repeated
+    :param current: results dict from run_repeated
+    :param threshold: largest allowed relative worsening, e.g. 0.2 for 20%
+    :return: list of regressions, empty if there are none
+    """
+
+    regressions = []
+    for metric, higher_is_better in METRICS.items():
+        base, value = baseline.get(metric), current.get(metric)
+        if base is None or value is None or base == 0:
+            continue
+
+        change = (value - base) / base
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > threshold else ""
+        print(f"{metric:<22} baseline {base:>12.4f}  current {value:>12.4f}  change {change:+.1%} {flag}")
+        if flag:
+            regressions.append(f"{metric} worse by {worse:.1%}")
+
+    if current["moved"] < current["moves_expected"]:
+        regressions.append(f"only {current['moved']} of {current['moves_expected']} moves made")
+
+    return regressions
+
+
+def save(path, scenario, results):
+    with open(path, "w") as handle:
+        json.dump({"scenario": scenario, "results": results}, handle, indent=1)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="ZoomBot performance regression suite")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run a load scenario")
+    run_parser.add_argument("--backend", choices=sorted(BACKENDS), default="fake")
+    run_parser.add_argument("--attendees", type=int, default=1000)
+    run_parser.add_argument("--rooms", type=int, default=40)
+    run_parser.add_argument("--commands", type=int, default=300)
+    run_parser.add_argument("--typos", type=float, default=0.1, help="fraction of commands with a typo")
+    run_parser.add_argument("--duplicates", type=float, default=0.1, help="fraction of commands sent twice")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--timeout", type=float, default=600, help="seconds")
+    run_parser.add_argument("--repeats", type=int, default=5, help="runs whose median is reported")
+    run_parser.add_argument("--save", help="write the results to this JSON file, e.g. as a baseline")
+
+    compare_parser = subparsers.add_parser("compare", help="re-run a baseline's scenario and compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+    compare_parser.add_argument("--save", help="write the new results to this JSON file")
+
+    args = parser.parse_args()
+
+    if args.mode == "run":
+        scenario = {key: getattr(args, key) for key in
+                    ["backend", "attendees", "rooms", "commands", "typos", "duplicates", "seed", "timeout", "repeats"]}
+        results = run_repeated(scenario)
+        print(json.dumps(results, indent=1))
+        if args.save:
+            save(args.save, scenario, results)
+
+    else:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+
+        results = run_repeated(baseline["scenario"])
+        if args.save:
+            save(args.save, baseline["scenario"], results)
+
+        found = compare(baseline["results"], results, args.threshold)
+        for regression in found:
+            print(f"Regression: {regression}")
+        sys.exit(1 if found else 0)
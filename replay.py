@@ -0,0 +1,269 @@
+"""
+Replays a trace recorded with conf.meeting_params["record_path"] through the bot's command handling, against a fake
+driver instead of Chrome, so that parsing, dedupe and move planning can be checked and timed offline
+
+Usage:
+python replay.py trace.jsonl [--realtime] [--speed FACTOR]
+
+By default the trace is replayed as fast as possible. --realtime keeps the recorded gaps between records, divided by
+--speed. Prints a JSON summary: records and commands handled, moves made, replies posted, WebDriver calls, throughput
+and the final room of every attendee. Two versions can be compared by diffing their summaries for the same trace
+"""
+
+import sys
+import json
+import time
+import argparse
+from zoom_meeting import ZoomMeeting
+from trace_recorder import load_trace
+from scaroomassign import check_chat
+from conf import meeting_params, N
+from zoom_scripts import CHAT_SNAPSHOT_JS, ROSTER_SNAPSHOT_JS, INSTALL_CHAT_OBSERVER_JS, DRAIN_CHAT_EVENTS_JS, \
+    PROBE_ELEMENT_JS, UI_STATE_JS, MOVE_ATTENDEE_JS, POST_CHAT_JS
+
+
+class FakeElement(object):
+    """
+    Element returned by FakeDriver's find_element calls. Text typed into the broadcast textarea is recorded as a
+    broadcast, and everything else is accepted and ignored
+    """
+
+    def __init__(self, driver, link_tag):
+        self.driver     = driver
+        self.link_tag   = link_tag
+
+    def find_element(self, by_tag, link_tag):
+        return FakeElement(self.driver, link_tag)
+
+    def find_element_by_xpath(self, xpath):
+        return FakeElement(self.driver, xpath)
+
+    def find_element_by_class_name(self, name):
+        return FakeElement(self.driver, name)
+
+    def send_keys(self, *keys):
+        if self.link_tag == "bo-room-broadcast-paper__textarea":
+            self.driver.broadcasts.append("".join(keys))
+
+    def click(self):
+        pass
+
+    def get_attribute(self, name):
+        return ""
+
+
+class FakeDriver(object):
+    """
+    Stands in for a WebDriver on a meeting whose breakout rooms are open. It answers the scripts in zoom_scripts.py from
+    an in-memory roster and chat queue, which the replay fills from the trace, and hands out FakeElements for the few
+    steps that still find elements, such as broadcasting. Calls go through execute as they do in selenium, so
+    ZoomMeeting counts them in webdriver_calls
+    """
+
+    def __init__(self, room_names):
+        self.room_names = list(room_names)
+        self.rooms      = {room_name: [] for room_name in ["Unassigned"] + self.room_names}
+        self.chat       = []
+        self.seq        = 0
+        self.observer   = False
+        self.posted     = []
+        self.broadcasts = []
+        self.moves      = 0
+
+    def execute(self, driver_command, params=None):
+        """
+        Answers executeScript and executeAsyncScript commands. Other commands do nothing
+        :param driver_command:
+        :param params:
+        :return: response dict
+        """
+
+        if driver_command in ("executeScript", "executeAsyncScript"):
+            return {"value": self.run_script(params["script"], params["args"])}
+        return {"value": None}
+
+    def execute_script(self, script, *args):
+        return self.execute("executeScript", {"script": script, "args": list(args)})["value"]
+
+    def execute_async_script(self, script, *args):
+        return self.execute("executeAsyncScript", {"script": script, "args": list(args)})["value"]
+
+    def find_element(self, by_tag, link_tag):
+        return FakeElement(self, link_tag)
+
+    def find_element_by_xpath(self, xpath):
+        return FakeElement(self, xpath)
+
+    def find_element_by_class_name(self, name):
+        return FakeElement(self, name)
+
+    def implicitly_wait(self, time_to_wait):
+        pass
+
+    def set_rooms(self, rooms):
+        """
+        Replaces the roster with a recorded one
+        :param rooms: dict of room name -> list of attendees
+        :return:
+        """
+
+        self.rooms = {room_name: [] for room_name in ["Unassigned"] + self.room_names}
+        for room_name, attendees in rooms.items():
+            self.rooms.setdefault(room_name, []).extend(attendees)
+
+    def post_chat(self, events):
+        """
+        Queues recorded chat lines for the next DRAIN_CHAT_EVENTS_JS
+        :param events:
+        :return:
+        """
+
+        for event in events:
+            self.seq += 1
+            self.chat.append(dict(event, seq=self.seq))
+
+    def location(self, user):
+        return next((room_name for room_name, attendees in self.rooms.items() if user in attendees), None)
+
+    def room_list(self):
+        order = (["Unassigned"] if self.rooms["Unassigned"] else []) + \
+            [room_name for room_name in self.rooms if room_name != "Unassigned"]
+        return [{"idx": i + 1, "name": room_name, "expanded": True, "attendees": list(self.rooms[room_name])}
+                for i, room_name in enumerate(order)]
+
+    def run_script(self, script, args):
+        """
+        Returns what script would return on a meeting page in the fake's state
+        :param script: one of the zoom_scripts constants
+        :param args:
+        :return:
+        """
+
+        if script is DRAIN_CHAT_EVENTS_JS:
+            if not self.observer:
+                return None
+            events, self.chat = self.chat, []
+            return events
+
+        if script is INSTALL_CHAT_OBSERVER_JS:
+            installed, self.observer = self.observer, True
+            return not installed
+
+        if script is ROSTER_SNAPSHOT_JS:
+            return self.room_list()
+
+        if script is UI_STATE_JS:
+            return {"help_window_open": False,
+                    "breakout_menu_open": True,
+                    "rooms_started": True,
+                    "unassigned_present": bool(self.rooms["Unassigned"]),
+                    "chat_open": True}
+
+        if script is MOVE_ATTENDEE_JS:
+            user, target_room = args[0], args[1]
+            source = self.location(user)
+            if source is None:
+                return {"ok": False, "reason": "attendee not found", "source": None, "options": []}
+            if target_room not in self.rooms or target_room in (source, "Unassigned"):
+                return {"ok": False, "reason": "no menu option for the target room", "source": source,
+                        "options": [room_name for room_name in self.room_names if room_name != source]}
+            self.rooms[source].remove(user)
+            self.rooms[target_room].append(user)
+            self.moves += 1
+            return {"ok": True, "reason": None, "source": source, "options": []}
+
+        if script is POST_CHAT_JS:
+            self.posted.append(args[0])
+            return True
+
+        if script is PROBE_ELEMENT_JS:
+            return None
+
+        if script is CHAT_SNAPSHOT_JS:
+            return []
+
+        raise NotImplementedError(f"The fake driver can't run: {script.strip().splitlines()[0]}")
+
+
+def new_fake_meeting(params=None):
+    """
+    Returns a ZoomMeeting attached to a FakeDriver, with the chat observer installed. Recording, staging and
+    checkpoints are off
+    :param params: meeting_params, defaults to conf.meeting_params
+    :return: (ZoomMeeting, FakeDriver)
+    """
+
+    params = dict(params or meeting_params, record_path=None, staging_params=None, SESSION_PATH=None)
+    zm = ZoomMeeting(params)
+    fake = FakeDriver(zm.room_names)
+    zm.d = fake
+    zm.install_chat_observer()
+    return zm, fake
+
+
+def replay(records, realtime=False, speed=1.0, params=None):
+    """
+    Feeds records through a ZoomMeeting on a FakeDriver. Roster records replace the fake's roster and refresh the roster
+    index. Chat records are queued and handled by one chat check of the main loop. The outbox's clock follows the
+    recorded times, so replies are rate limited and deduplicated the same way with or without realtime
+    :param records: result of trace_recorder.load_trace
+    :param realtime: keep the recorded gaps between records
+    :param speed: divides the gaps when realtime is True
+    :param params: meeting_params, defaults to conf.meeting_params
+    :return: dict summary
+    """
+
+    zm, fake = new_fake_meeting(params)
+
+    commands = 0
+    start = time.perf_counter()
+    first_t = records[0]["t"] if records else 0
+    recorded_now = first_t
+    zm.outbox.clock = lambda: recorded_now
+
+    for record in records:
+        recorded_now = record["t"]
+        if realtime:
+            delay = (record["t"] - first_t) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        if record["kind"] == "roster":
+            fake.set_rooms(record["rooms"])
+            zm.refresh_roster()
+        elif record["kind"] == "chat":
+            fake.post_chat(record["events"])
+            commands += sum(len(zm.grammar.parse(event["line"])) for event in record["events"])
+            check_chat(zm, "observer", N)
+
+    # Post every reply still queued, max_lines at a time
+    while zm.outbox.lines and zm.flush_chat(force=True):
+        pass
+    elapsed = time.perf_counter() - start
+
+    return {"records": len(records),
+            "commands": commands,
+            "moves": fake.moves,
+            "posts": len(fake.posted),
+            "broadcasts": len(fake.broadcasts),
+            "webdriver_calls": zm.webdriver_calls,
+            "seconds": elapsed,
+            "commands_per_second": commands / elapsed if elapsed else 0.0,
+            "finished": {f"{command} {status}": count for (command, status), count in
+                         sorted(zm.tracer.finished_counts.items())},
+            "locations": {user: room_name for room_name, attendees in sorted(fake.rooms.items())
+                          for user in sorted(attendees)},
+            "replies": fake.posted}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Replay a recorded meeting trace against a fake driver")
+    parser.add_argument("trace")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded gaps between records")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed-up factor for --realtime")
+    args = parser.parse_args()
+
+    summary = replay(load_trace(args.trace), args.realtime, args.speed)
+    json.dump(summary, sys.stdout, indent=1)
+    print()
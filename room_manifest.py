@@ -0,0 +1,122 @@
+"""
+Room manifests: the breakout rooms for an event, read from a YAML or CSV file instead of conf.room_names. Each room has
+a name and, optionally, a capacity and a list of attendees to assign to it before rooms are opened
+
+YAML:
+
+rooms:
+  - name: Cooking
+    capacity: 20
+    attendees: [Alice, Bob]
+  - name: Chatroom 1
+
+CSV, with attendees separated by semicolons:
+
+name,capacity,attendees
+Cooking,20,Alice;Bob
+Chatroom 1,,
+"""
+
+import os
+import csv
+
+
+def parse_room(entry, where):
+    """
+    Normalises one manifest entry
+    :param entry: dict with "name" and optional "capacity" and "attendees"
+    :param where: description of the entry's position for error messages
+    :return: dict with keys "name", "capacity" (int or None) and "attendees" (list of str)
+    """
+
+    name = str(entry.get("name") or "").strip()
+    if not name:
+        raise ValueError(f"Room {where} has no name")
+
+    capacity = entry.get("capacity")
+    if capacity in (None, ""):
+        capacity = None
+    else:
+        capacity = int(capacity)
+        if capacity < 1:
+            raise ValueError(f"Room {name} has capacity {capacity}")
+
+    attendees = entry.get("attendees") or []
+    if isinstance(attendees, str):
+        attendees = attendees.split(";")
+    attendees = [str(attendee).strip() for attendee in attendees if str(attendee).strip()]
+
+    if capacity is not None and len(attendees) > capacity:
+        raise ValueError(f"Room {name} has {len(attendees)} attendees assigned but capacity {capacity}")
+
+    return {"name": name, "capacity": capacity, "attendees": attendees}
+
+
+def load_manifest(path):
+    """
+    Reads a room manifest. Files ending in .csv are read as CSV and anything else as YAML, which needs PyYAML
+    :param path:
+    :return: list of rooms, see parse_room, in the order they appear
+    """
+
+    if os.path.splitext(path)[1].lower() == ".csv":
+        with open(path, newline="") as handle:
+            entries = list(csv.DictReader(handle))
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Reading a YAML room manifest needs PyYAML (pip install pyyaml), or use a CSV manifest")
+
+        with open(path) as handle:
+            data = yaml.safe_load(handle) or []
+        entries = data.get("rooms", []) if isinstance(data, dict) else data
+
+    rooms = [parse_room(entry, f"{i + 1} of {path}") for i, entry in enumerate(entries)]
+
+    names = [room["name"] for room in rooms]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Rooms listed more than once in {path}: {duplicates}")
+
+    attendees = [attendee for room in rooms for attendee in room["attendees"]]
+    duplicates = sorted({attendee for attendee in attendees if attendees.count(attendee) > 1})
+    if duplicates:
+        raise ValueError(f"Attendees assigned to more than one room in {path}: {duplicates}")
+
+    if not rooms:
+        raise ValueError(f"No rooms in {path}")
+
+    return rooms
+
+
+def verify_manifest(rooms, snapshot):
+    """
+    Compares the breakout room list with the manifest
+    :param rooms: result of load_manifest
+    :param snapshot: result of ZoomMeeting.roster_snapshot
+    :return: list of problems, empty if the room list matches the manifest
+    """
+
+    problems = []
+    listed = [name for name in snapshot if name != "Unassigned"]
+    expected = [room["name"] for room in rooms]
+
+    for name in expected:
+        if name not in snapshot:
+            problems.append(f"Room {name} is missing")
+    for name in listed:
+        if name not in expected:
+            problems.append(f"Room {name} is not in the manifest")
+    if not problems and listed != expected:
+        problems.append(f"Rooms are in the order {listed}, not {expected}")
+
+    for room in rooms:
+        attendees = snapshot.get(room["name"], {}).get("attendees", [])
+        if room["capacity"] is not None and len(attendees) > room["capacity"]:
+            problems.append(f"Room {room['name']} has {len(attendees)} attendees, capacity {room['capacity']}")
+        for attendee in room["attendees"]:
+            if room["name"] in snapshot and attendee not in attendees:
+                problems.append(f"{attendee} is not in {room['name']}")
+
+    return problems
@@ -0,0 +1,89 @@
+"""
+In-memory index of who is in which breakout room. It is kept in sync by applying the differences between successive
+roster snapshots, so it also picks up moves made by hosts or by Zoom's self-select feature
+"""
+
+
+class RosterIndex(object):
+    """
+    Holds user -> room and room -> ordered members. Lookups and counts are dictionary operations and make no WebDriver
+    calls
+    """
+
+    def __init__(self):
+        self.rooms      = dict()  # room name -> list of members in room list order
+        self.locations  = dict()  # user name -> room name
+
+    def apply_snapshot(self, snapshot):
+        """
+        Brings the index in line with snapshot. Only rooms whose member lists changed are touched
+        :param snapshot: result of ZoomMeeting.roster_snapshot
+        :return: list of (user, old room, new room) for everyone who joined, left or changed rooms. old room or new room
+            is None for users who joined or left the meeting
+        """
+
+        new_rooms = {room_name: list(room["attendees"]) for room_name, room in snapshot.items()}
+        changed = [room_name for room_name in set(self.rooms) | set(new_rooms)
+                   if self.rooms.get(room_name, []) != new_rooms.get(room_name, [])]
+
+        old_locations = dict()
+        for room_name in changed:
+            for user in self.rooms.get(room_name, []):
+                if self.locations.get(user) == room_name:
+                    old_locations[user] = room_name
+                    del self.locations[user]
+
+        for room_name in changed:
+            for user in new_rooms.get(room_name, []):
+                self.locations[user] = room_name
+
+        self.rooms = new_rooms
+
+        changes = []
+        for user in set(old_locations) | {user for room_name in changed for user in new_rooms.get(room_name, [])}:
+            old_room, new_room = old_locations.get(user), self.locations.get(user)
+            if old_room != new_room:
+                changes.append((user, old_room, new_room))
+
+        return changes
+
+    def apply_move(self, user, room_name):
+        """
+        Records a move the bot has just made, ahead of the next snapshot
+        :param user:
+        :param room_name:
+        :return:
+        """
+
+        old_room = self.locations.get(user)
+        if old_room is not None and user in self.rooms.get(old_room, []):
+            self.rooms[old_room].remove(user)
+
+        self.rooms.setdefault(room_name, []).append(user)
+        self.locations[user] = room_name
+
+    def location(self, user):
+        """
+        Returns the room user is in, or None if they are not in the index
+        :param user:
+        :return:
+        """
+
+        return self.locations.get(user)
+
+    def members(self, room_name):
+        """
+        Returns the members of room_name in room list order
+        :param room_name:
+        :return: list of user names
+        """
+
+        return list(self.rooms.get(room_name, []))
+
+    def counts(self):
+        """
+        Returns the number of members of each room
+        :return: dict of room name -> int
+        """
+
+        return {room_name: len(members) for room_name, members in self.rooms.items()}
@@ -2,72 +2,149 @@
 
 SCA Room Assign Tool
 
-Known Bugs:
+Chat lines are queued in the meeting page by a MutationObserver (see ZoomMeeting.install_chat_observer) and drained once
+per loop, or, with CHAT_SOURCE = "cursor", polled from the N most recent chat items past a persistent cursor (see
+ZoomMeeting.read_new_chat_lines). Either way each line is handled exactly once, so a message that Zoom merges into an
+earlier one from the same author, e.g.
 
-User Input to chat box:
 AssignMeTo:
 AssignMeTo: <Valid Room Name>
 
-Expected Result:
-User assigned to <Valid Room>, error message displayed for first command
-
-Result:
-Command ignored
-
-Notes:
-I suspect this is because zoom_meeting.trim_message() is incorrectly trimming this message, causing the keyword to be
-stripped out. The easiest fix is to just ask people to enter their command again
+is read as two separate lines and the user is assigned by the second
 """
 
+import asyncio
 from zoom_meeting import ZoomMeeting
-from conf import meeting_params, N, existing_meeting_id
-
-# Initialise a Zoom meeting and check if a driver exists
-zm = ZoomMeeting(meeting_params)
-resume_meeting_successful = zm.add_driver(existing_meeting_id)
+from bot_runtime import BotRuntime
+from commands import read_chat, parse_message, broadcast, make_moves, refresh_roster
+from scheduler import TickScheduler, AdaptiveInterval
+from conf import meeting_params, existing_meeting_id, N, CHAT_SOURCE, ASYNC_RUNTIME, runtime_params, \
+    scheduler_params
 
-if resume_meeting_successful:
-    zm.resume_call()
 
-else:  # Make new meeting or start a scheduled one
+def start_meeting(zm, existing_meeting_id):
+    """
+    Reconnects to the meeting in the checkpoint if its Chrome window is still open, and otherwise starts a new meeting
+    or the scheduled one with existing_meeting_id
+    :param zm: ZoomMeeting
+    :param existing_meeting_id:
+    :return:
+    """
 
-    if not zm.logged_in():
-        zm.login()
+    resume_meeting_successful = zm.add_driver(existing_meeting_id)
 
-    if existing_meeting_id is not None:  # scheduled
-        zm.start_scheduled_call(existing_meeting_id)
-    else:  # new
-        zm.start_new_call()
+    if resume_meeting_successful:
+        zm.resume_call()
 
-# Main loop
-while True:
+    else:  # Make new meeting or start a scheduled one
 
-    # Close help windows
-    if zm.ask_for_help_window_open():
-        zm.close_ask_for_help()
+        if not zm.logged_in():
+            zm.login()
 
-    # Get N most recent messages. If any new messages, trim them and check for keywords (broadcast phrase and
-    # move phrase)
-    authors, messages = zm.get_n_most_recent_chat_messages(N)
-    if zm.new_messages([authors, messages]):
+        if existing_meeting_id is not None:  # scheduled
+            zm.start_scheduled_call(existing_meeting_id)
+        else:  # new
+            zm.start_new_call()
 
-        trimmed_messages = zm.trim_messages(messages, authors, N)
-        for message_idx, message in enumerate(trimmed_messages):
 
-            # Broadcast to all rooms
-            if zm.broadcast_phrase in message:
-                bc_message = zm.extract_from_message(message, zm.broadcast_phrase)
-                if bc_message not in zm.broadcast_history:
-                    print(f"Broadcasting : {bc_message}")
-                    zm.broadcast_message(bc_message)
+def check_help(zm):
+    """
+    Closes the "Ask Host for Help" window if it is open
+    :param zm: ZoomMeeting
+    :return: True if a window was closed
+    """
 
-            # Move people around
-            if zm.move_phrase in message:
-                target_room = zm.extract_from_message(message, zm.move_phrase)
-                target_user = authors[message_idx]
-
-                if zm.move_is_valid(target_user, target_room):
-                    print(f"Moving {target_user} to {target_room}")
-                    zm.move_user_to_room(target_user, target_room)
-
-    zm.n_most_recent = [authors, messages]
+    if zm.ask_for_help_window_open():
+        zm.close_ask_for_help()
+        zm.flush_chat()
+        return True
+    return False
+
+
+def report_memory(zm):
+    """
+    Prints the sizes of the bot's in-memory stores
+    :param zm: ZoomMeeting
+    :return: False, as there is never anything to do
+    """
+
+    print(f"Memory: {zm.memory_report()}")
+    return False
+
+
+def check_chat(zm, chat_source, n):
+    """
+    Handles every chat line posted since the last check. Broadcasts are sent straight away and moves are made together
+    at the end. Replies to all of them are then posted as one chat message
+    :param zm: ZoomMeeting
+    :param chat_source: "observer" or "cursor"
+    :param n: chat items read per check when chat_source is "cursor"
+    :return: True if there were any new chat lines
+    """
+
+    events = read_chat(zm, chat_source, n)
+    commands = [command for event in events
+                for command in parse_message(zm, event["author"], event["line"], event["time"])]
+
+    # The UI is read once for all of the check's commands, and not at all when there are none
+    state = zm.ui_state() if commands else None
+
+    pending_moves = []
+    for command, author, argument in commands:
+        if command == "broadcast":
+            broadcast(zm, argument, author, state)
+        elif command == "move":
+            pending_moves.append((author, argument))
+
+    if pending_moves:
+        make_moves(zm, pending_moves, state)
+
+    zm.flush_chat()
+    zm.tracer.maybe_export()
+    if zm.profiler is not None:
+        zm.profiler.end_iteration()
+    zm.maybe_checkpoint(force=bool(events))
+
+    return bool(events)
+
+
+def run_bot(meeting_params, existing_meeting_id=None, chat_source=CHAT_SOURCE, n=N, async_runtime=ASYNC_RUNTIME,
+            scheduler_params=scheduler_params, runtime_params=runtime_params, on_metrics=None):
+    """
+    Runs the ZoomBot for one meeting until it is interrupted
+    :param meeting_params: see conf.py
+    :param existing_meeting_id: either a valid meeting ID or None
+    :param chat_source: "observer" or "cursor"
+    :param n: chat items read per check when chat_source is "cursor"
+    :param async_runtime: True runs the asyncio pipeline in bot_runtime.py instead of the serial main loop
+    :param scheduler_params: see conf.py
+    :param runtime_params: see conf.py
+    :param on_metrics: optional function taking the ZoomMeeting, called every metrics_interval seconds (see
+        scheduler_params and runtime_params), e.g. to report to orchestrator.py
+    :return:
+    """
+
+    zm = ZoomMeeting(meeting_params)
+    start_meeting(zm, existing_meeting_id)
+
+    if async_runtime:
+        asyncio.run(BotRuntime(zm, dict(runtime_params, chat_source=chat_source, N=n), on_metrics).run())
+        return
+
+    # Main loop
+    scheduler = TickScheduler(scheduler_params["report_interval"])
+    scheduler.add("help", lambda: check_help(zm), scheduler_params["help_interval"])
+    scheduler.add("roster", lambda: refresh_roster(zm), scheduler_params["roster_interval"])
+    if zm.staging is not None:
+        scheduler.add("staging", zm.run_staging, scheduler_params["staging_interval"])
+    scheduler.add("memory", lambda: report_memory(zm), scheduler_params["memory_report_interval"])
+    if on_metrics is not None:
+        scheduler.add("metrics", lambda: on_metrics(zm), scheduler_params["metrics_interval"])
+    scheduler.add("chat", lambda: check_chat(zm, chat_source, n),
+                  AdaptiveInterval(scheduler_params["chat_min_interval"], scheduler_params["chat_max_interval"],
+                                   scheduler_params["backoff"]))
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    run_bot(meeting_params, existing_meeting_id)
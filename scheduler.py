@@ -0,0 +1,129 @@
+"""
+Scheduling for the main loop. Instead of spinning as fast as Selenium allows, each check runs on its own interval. The
+chat check polls quickly just after activity and backs off exponentially while the chat is idle
+"""
+
+import time
+
+
+class AdaptiveInterval(object):
+    """
+    Interval that drops to min_interval after activity and grows by backoff after every idle run, up to max_interval
+    """
+
+    def __init__(self, min_interval, max_interval, backoff=2.0):
+        self.min_interval   = min_interval
+        self.max_interval   = max_interval
+        self.backoff        = backoff
+        self.interval       = min_interval
+
+    def next(self, active):
+        """
+        Returns the interval to wait before the next run
+        :param active: True if the run that just finished found something to do
+        :return: seconds
+        """
+
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return self.interval
+
+
+class TickScheduler(object):
+    """
+    Runs registered checks when they are due and sleeps in between. A check is a function that returns True if it found
+    something to do, which resets an adaptive interval to its minimum.
+
+    Every report_interval seconds the scheduler prints how many runs each check made, the CPU time the process used and
+    the duty cycle, i.e. the fraction of wall-clock time spent running checks rather than sleeping
+    """
+
+    def __init__(self, report_interval=300):
+        self.report_interval    = report_interval
+        self.tasks              = []
+        self.started            = None
+        self.started_cpu        = 0.0
+        self.busy_time          = 0.0
+        self.last_report        = time.time()
+
+    def add(self, name, fn, interval):
+        """
+        Registers a check
+        :param name: used in reports
+        :param fn: function taking no arguments and returning True if it found something to do
+        :param interval: seconds between runs, or an AdaptiveInterval
+        :return:
+        """
+
+        if not isinstance(interval, AdaptiveInterval):
+            interval = AdaptiveInterval(interval, interval, 1)
+        self.tasks.append({"name": name, "fn": fn, "interval": interval, "due": 0.0, "runs": 0, "active_runs": 0})
+
+    def run_once(self):
+        """
+        Waits until the next check is due and runs it
+        :return:
+        """
+
+        if self.started is None:
+            self.started = time.time()
+            self.started_cpu = time.process_time()
+
+        task = min(self.tasks, key=lambda t: t["due"])
+        wait = task["due"] - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+        start = time.time()
+        active = bool(task["fn"]())
+        end = time.time()
+
+        self.busy_time += end - start
+        task["runs"] += 1
+        task["active_runs"] += active
+        task["due"] = end + task["interval"].next(active)
+
+        if end - self.last_report >= self.report_interval:
+            print(self.report())
+            self.last_report = end
+
+    def run_forever(self):
+        """
+        Runs checks until interrupted
+        :return:
+        """
+
+        while True:
+            self.run_once()
+
+    def stats(self):
+        """
+        Returns run counts, CPU time and duty cycle since the scheduler started
+        :return: dict
+        """
+
+        wall_time = time.time() - self.started if self.started is not None else 0.0
+        cpu_time = time.process_time() - self.started_cpu
+        return {"wall_seconds": wall_time,
+                "cpu_seconds": cpu_time,
+                "cpu_fraction": cpu_time / wall_time if wall_time else 0.0,
+                "duty_cycle": self.busy_time / wall_time if wall_time else 0.0,
+                "tasks": {task["name"]: {"runs": task["runs"],
+                                         "active_runs": task["active_runs"],
+                                         "interval": task["interval"].interval} for task in self.tasks}}
+
+    def report(self):
+        """
+        Formats stats() for printing
+        :return: str
+        """
+
+        stats = self.stats()
+        lines = [f"Scheduler: {stats['wall_seconds']:.0f}s running, CPU {stats['cpu_fraction']:.1%}, "
+                 f"duty cycle {stats['duty_cycle']:.1%}"]
+        for name, task in stats["tasks"].items():
+            lines.append(f"  {name}: {task['runs']} runs, {task['active_runs']} active, "
+                         f"current interval {task['interval']:.2f}s")
+        return "\n".join(lines)
@@ -0,0 +1,186 @@
+"""
+Meeting setup as a dependency graph of steps. Instead of sleeping for a fixed time and then running every step in order,
+each step runs as soon as the steps it depends on are finished and the page shows it is ready. Readiness and completion
+are read from one page probe per poll, so waiting costs one WebDriver call per poll however many steps are waiting
+"""
+
+import time
+from selenium.common.exceptions import WebDriverException
+
+
+class SetupStep(object):
+    """
+    One setup action. ready and done are functions of the latest probe result:
+    - ready(state) is True when the page is ready for the action, e.g. the button it clicks is shown
+    - done(state) is True when the action's effect is already in place, which makes re-running setup idempotent: done
+      steps are skipped, and a step only counts as finished once done holds after its action
+
+    A step that is not finished within timeout seconds of becoming eligible fails, or is skipped if it is optional.
+    Actions that raise a WebDriverException are retried up to retries more times
+    """
+
+    def __init__(self, name, action, after=(), ready=None, done=None, timeout=30, retries=2, optional=False):
+        self.name       = name
+        self.action     = action
+        self.after      = tuple(after)
+        self.ready      = ready if ready is not None else lambda state: True
+        self.done       = done
+        self.timeout    = timeout
+        self.retries    = retries
+        self.optional   = optional
+
+        self.status     = "pending"  # pending, waiting, running, done, skipped, failed
+        self.attempts   = 0
+        self.eligible   = None  # time.time() when every step in after had finished
+        self.started    = None
+        self.finished   = None
+        self.error      = None
+
+
+class SetupPipeline(object):
+    """
+    Runs SetupSteps in dependency order. probe is a function returning the page state that the steps' ready and done
+    functions are given. Steps are tried in the order given whenever more than one can run
+    """
+
+    def __init__(self, steps, probe, poll_interval=0.25):
+        self.steps          = list(steps)
+        self.probe          = probe
+        self.poll_interval  = poll_interval
+        self.started        = None
+        self.finished       = None
+
+        names = {step.name for step in self.steps}
+        for step in self.steps:
+            missing = [name for name in step.after if name not in names]
+            if missing:
+                raise ValueError(f"Setup step {step.name} depends on unknown steps {missing}")
+
+    def step(self, name):
+        """
+        Returns the step called name
+        :param name:
+        :return: SetupStep
+        """
+
+        return next(step for step in self.steps if step.name == name)
+
+    def eligible(self, step):
+        """
+        Returns True if every step that step depends on has finished, successfully or not
+        :param step:
+        :return:
+        """
+
+        return all(self.step(name).status in ("done", "skipped", "failed") for name in step.after)
+
+    def run(self):
+        """
+        Runs until every step has finished
+        :return: True if no step failed
+        """
+
+        self.started = time.time()
+
+        while True:
+            open_steps = [step for step in self.steps if step.status in ("pending", "waiting")]
+            if not open_steps:
+                break
+
+            state = self.probe()
+            now = time.time()
+            acted = False
+
+            for step in open_steps:
+                if not self.eligible(step):
+                    continue
+
+                blocked = [name for name in step.after if self.step(name).status == "failed"]
+                if blocked:
+                    self.finish(step, "failed", f"depends on failed steps {blocked}")
+                    continue
+
+                if step.eligible is None:
+                    step.eligible = now
+
+                if step.done is not None and step.done(state):
+                    self.finish(step, "done" if step.attempts else "skipped")
+                    continue
+
+                if now - step.eligible > step.timeout:
+                    self.finish(step, "skipped" if step.optional else "failed",
+                                step.error or f"not finished after {step.timeout}s")
+                    continue
+
+                # After an action, wait for done to hold rather than repeating it, unless it raised
+                if step.status == "waiting" or acted or not step.ready(state):
+                    continue
+
+                self.attempt(step)
+                acted = True
+
+            if not acted:
+                time.sleep(self.poll_interval)
+
+        self.finished = time.time()
+        return not any(step.status == "failed" for step in self.steps)
+
+    def attempt(self, step):
+        """
+        Runs step's action once
+        :param step:
+        :return:
+        """
+
+        step.attempts += 1
+        if step.started is None:
+            step.started = time.time()
+        print(f"Setup: {step.name}")
+
+        try:
+            step.action()
+        except WebDriverException as e:
+            step.error = str(e).strip()
+            if step.attempts > step.retries:
+                self.finish(step, "skipped" if step.optional else "failed", step.error)
+            return
+
+        if step.done is None:
+            self.finish(step, "done")
+        else:
+            step.status = "waiting"
+
+    def finish(self, step, status, error=None):
+        """
+        Records the end of a step
+        :param step:
+        :param status: "done", "skipped" or "failed"
+        :param error:
+        :return:
+        """
+
+        step.status = status
+        step.finished = time.time()
+        if error is not None:
+            step.error = error
+            print(f"Setup: {step.name} {status}: {error}")
+
+    def report(self):
+        """
+        Returns a table of when each step started and finished, relative to the start of the run. Commands are served
+        only once run returns, so the time the run finished is reported as the time to first command
+        :return: str
+        """
+
+        def offset(t):
+            return "-" if t is None else f"{t - self.started:.2f}s"
+
+        lines = ["step                     status   attempts  started  finished"]
+        for step in self.steps:
+            lines.append(f"{step.name:<24} {step.status:<8} {step.attempts:>8}  {offset(step.started):>7}  "
+                         f"{offset(step.finished):>8}")
+
+        if self.finished is not None:
+            lines.append(f"setup took {self.finished - self.started:.2f}s (time to first command)")
+
+        return "\n".join(lines)
@@ -0,0 +1,118 @@
+"""
+Runs ZoomMeeting against the local Zoom simulator (zoom_sim.html) in headless Chrome, so code paths can be exercised and
+timed without a live meeting
+
+Usage:
+python simulate.py [attendees ...]
+
+For each attendee count (default 50, 500 and 1000) every attendee asks to move to a room over chat, then the same
+command handling as the main loop in scaroomassign.py runs until everyone has been moved. Moves per second and command
+latency (from the command appearing in chat to the attendee being in the room) are printed
+"""
+
+import os
+import sys
+import time
+from selenium import webdriver
+from zoom_meeting import ZoomMeeting
+from scaroomassign import check_chat
+from conf import meeting_params, CHROME_PATH, N
+
+SIM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zoom_sim.html")
+
+
+def new_sim_driver(headless=True):
+    """
+    Starts Chrome on the simulator page
+    :param headless:
+    :return: driver
+    """
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument("--window-size=1920,1080")
+
+    driver = webdriver.Chrome(CHROME_PATH, options=options)
+    driver.get("file://" + SIM_PATH)
+    return driver
+
+
+def new_sim_meeting(driver, room_names=None):
+    """
+    Returns a ZoomMeeting attached to a simulator page, with its rooms set up and the chat observer installed.
+    Checkpoints are off
+    :param driver: driver from new_sim_driver
+    :param room_names: defaults to the room names in conf.py
+    :return: ZoomMeeting
+    """
+
+    params = dict(meeting_params, SESSION_PATH=None)
+    if room_names is not None:
+        params["room_names"] = room_names
+
+    zm = ZoomMeeting(params)
+    zm.d = driver
+    zm.d.implicitly_wait(zm.short_wait)
+    zm.d.execute_script("zoomSim.setRooms(arguments[0])", zm.room_names)
+    zm.install_chat_observer()
+    return zm
+
+
+def run_move_load(zm, n_attendees, timeout=600):
+    """
+    Adds n_attendees to Unassigned, starts the rooms and has every attendee ask for a room over chat. Ticks are run
+    until everyone is in their room or timeout seconds pass
+    :param zm: ZoomMeeting from new_sim_meeting
+    :param n_attendees:
+    :param timeout: seconds
+    :return: dict of results
+    """
+
+    names = [f"Attendee {i}" for i in range(n_attendees)]
+    targets = [zm.room_names[i % len(zm.room_names)] for i in range(n_attendees)]
+
+    zm.d.execute_script("zoomSim.addParticipants(arguments[0]); zoomSim.startRooms();", names)
+    zm.d.execute_script("zoomSim.postChatBatch(arguments[0])",
+                        [[name, f"{zm.move_phrase}{target}"] for name, target in zip(names, targets)])
+
+    start = time.perf_counter()
+    latencies = dict()
+    ticks = 0
+
+    while len(latencies) < n_attendees and time.perf_counter() - start < timeout:
+        check_chat(zm, "observer", N)
+        ticks += 1
+
+        now = time.perf_counter() - start
+        locations = zm.d.execute_script("return zoomSim.locationsOf(arguments[0])", names)
+        for name, target, location in zip(names, targets, locations):
+            if location == target and name not in latencies:
+                latencies[name] = now
+
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latencies.values())
+
+    return {"attendees": n_attendees,
+            "moved": len(latencies),
+            "ticks": ticks,
+            "seconds": elapsed,
+            "moves_per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_latency": ordered[len(ordered) // 2] if ordered else None,
+            "p95_latency": ordered[int(len(ordered) * 0.95) - 1] if ordered else None}
+
+
+if __name__ == "__main__":
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50, 500, 1000]
+
+    for size in sizes:
+        sim_driver = new_sim_driver()
+        try:
+            result = run_move_load(new_sim_meeting(sim_driver), size)
+        finally:
+            sim_driver.quit()
+
+        print(f"{result['attendees']} attendees: moved {result['moved']} in {result['seconds']:.1f}s over "
+              f"{result['ticks']} ticks, {result['moves_per_second']:.1f} moves/s, "
+              f"p50 latency {result['p50_latency']}s, p95 latency {result['p95_latency']}s")
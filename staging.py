@@ -0,0 +1,119 @@
+"""
+Pre-open staging of breakout room assignments. Before rooms are opened, move commands and assignments from an attendee
+CSV are collected here instead of being made one at a time. They are applied to the page in batches, one assign dialog
+per room, and the rooms are opened only when the operator asks for it or at a scheduled time
+"""
+
+import os
+import csv
+import time
+import datetime
+from move_planner import group_by_target
+
+
+def parse_open_at(open_at):
+    """
+    Converts a scheduled opening time to seconds since the epoch
+    :param open_at: "HH:MM" (today, local time), seconds since the epoch, or None
+    :return: float or None
+    """
+
+    if open_at is None or isinstance(open_at, (int, float)):
+        return open_at
+
+    hour, minute = (int(part) for part in open_at.split(":"))
+    return datetime.datetime.combine(datetime.date.today(), datetime.time(hour, minute)).timestamp()
+
+
+def load_attendee_csv(path):
+    """
+    Reads assignments from a CSV with columns "attendee" and "room"
+    :param path:
+    :return: list of (attendee, room)
+    """
+
+    with open(path, newline="") as handle:
+        return [(row["attendee"].strip(), row["room"].strip()) for row in csv.DictReader(handle)
+                if row.get("attendee", "").strip() and row.get("room", "").strip()]
+
+
+class PreassignmentStage(object):
+    """
+    Holds assignments made before rooms are opened. pending maps user -> room for assignments not yet made on the page,
+    applied those that have been. A later assignment for the same user replaces an earlier one.
+
+    Rooms are opened once trigger_path exists (e.g. after "touch open_rooms") or open_at has passed
+    """
+
+    def __init__(self, staging_params):
+        self.pending        = dict()
+        self.applied        = dict()
+        self.trigger_path   = staging_params.get("trigger_path")
+        self.open_at        = parse_open_at(staging_params.get("open_at"))
+        self.opened         = False
+
+        if staging_params.get("attendee_csv") is not None:
+            for attendee, room in load_attendee_csv(staging_params["attendee_csv"]):
+                self.add(attendee, room)
+
+    def add(self, user, room):
+        """
+        Stages an assignment
+        :param user:
+        :param room:
+        :return:
+        """
+
+        if self.applied.get(user) == room:
+            return
+        self.pending[user] = room
+
+    def batches(self):
+        """
+        Returns the pending assignments grouped by room
+        :return: dict of room -> list of users
+        """
+
+        return group_by_target(self.pending)
+
+    def mark_applied(self, user, room):
+        """
+        Records that user was assigned to room on the page
+        :param user:
+        :param room:
+        :return:
+        """
+
+        if self.pending.get(user) == room:
+            del self.pending[user]
+        self.applied[user] = room
+
+    def restart(self):
+        """
+        Moves every applied assignment back to pending and marks rooms as not opened, for a new meeting
+        :return:
+        """
+
+        self.pending = dict(self.applied, **self.pending)
+        self.applied = dict()
+        self.opened = False
+
+    def should_open(self):
+        """
+        Returns True if the operator has asked for rooms to be opened or the scheduled time has passed
+        :return:
+        """
+
+        if self.trigger_path is not None and os.path.exists(self.trigger_path):
+            return True
+        return self.open_at is not None and time.time() >= self.open_at
+
+    def mark_opened(self):
+        """
+        Records that rooms are open and removes the trigger file so that it doesn't fire for the next meeting
+        :return:
+        """
+
+        self.opened = True
+        if self.trigger_path is not None and os.path.exists(self.trigger_path):
+            os.remove(self.trigger_path)
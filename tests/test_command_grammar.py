@@ -0,0 +1,43 @@
+from command_grammar import CommandGrammar, RoomIndex, edit_distance
+
+PHRASES = {"move": "AssignMeTo: ", "broadcast": "Broadcast: "}
+
+
+def test_single_command():
+    assert CommandGrammar(PHRASES).parse("AssignMeTo: Cooking") == [("move", "Cooking")]
+
+
+def test_several_commands_on_one_line():
+    grammar = CommandGrammar(PHRASES)
+    assert grammar.parse("AssignMeTo: Cooking Broadcast: Back in 5") == [("move", "Cooking"),
+                                                                        ("broadcast", "Back in 5")]
+
+
+def test_empty_argument_is_dropped():
+    grammar = CommandGrammar(PHRASES)
+    assert grammar.parse("Broadcast: AssignMeTo: Cooking") == [("move", "Cooking")]
+    assert grammar.parse("AssignMeTo:   ") == []
+
+
+def test_line_without_commands():
+    assert CommandGrammar(PHRASES).parse("hello everyone") == []
+
+
+def test_edit_distance():
+    assert edit_distance("cooking", "cookng", 2) == 1
+    assert edit_distance("cooking", "chess", 2) == 3
+
+
+def test_room_index_resolves_case_whitespace_and_prefixes():
+    index = RoomIndex(["Cooking", "Chess Club", "Chemistry"])
+    assert index.resolve("cooking") == "Cooking"
+    assert index.resolve("chess   club") == "Chess Club"
+    assert index.resolve("cook") == "Cooking"
+    assert index.resolve("che") is None
+    assert index.resolve("Gardening") is None
+
+
+def test_room_index_suggestions():
+    index = RoomIndex(["Cooking", "Chess Club", "Chemistry"])
+    assert index.suggest("Cokking") == ["Cooking"]
+    assert index.suggest("Gardening") == []
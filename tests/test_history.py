@@ -0,0 +1,100 @@
+from history import ExpiringSet, RateLimiter, CommandHistory
+from tracing import CommandTracer
+from commands import make_moves
+
+
+class FailingMeeting(object):
+    """
+    Just enough of a ZoomMeeting for make_moves, with moves that fail for the users in fail
+    """
+
+    def __init__(self, fail=(), invalid=()):
+        self.history    = CommandHistory()
+        self.tracer     = CommandTracer()
+        self.fail       = set(fail)
+        self.invalid    = set(invalid)
+
+    def move_is_valid(self, target_user, target_room, incoming=0):
+        return target_user not in self.invalid
+
+    def move_users_to_rooms(self, moves, state=None):
+        return {target_user: target_user not in self.fail for target_user in moves}
+
+
+def test_expiring_set_expires_and_evicts():
+    entries = ExpiringSet(ttl=10, max_size=2)
+    entries.add("a", now=0, value=1)
+    assert entries.get("a", now=5) == 1
+    assert not entries.contains("a", now=10)
+
+    entries.add("b", now=1)
+    entries.add("c", now=2)
+    entries.add("d", now=3)
+    assert list(entries.entries) == ["c", "d"]
+    assert entries.evicted == 2
+
+
+def test_rate_limiter_window():
+    limiter = RateLimiter(max_count=2, window=60)
+    assert limiter.allow("ann", now=0)
+    assert limiter.allow("ann", now=1)
+    assert not limiter.allow("ann", now=2)
+    assert limiter.allow("bob", now=2)
+    assert limiter.allow("ann", now=60)
+
+
+def test_identical_command_is_a_repeat():
+    history = CommandHistory()
+    assert history.admit("move", "ann", "Cooking", now=0) == "ok"
+    assert history.admit("move", "ann", "Cooking", now=1) == "repeat"
+    assert history.admit("move", "ann", "Cooking", now=11) == "ok"
+
+
+def test_different_argument_is_not_a_repeat():
+    history = CommandHistory()
+    assert history.admit("move", "ann", "Cooking", now=0) == "ok"
+    assert history.admit("move", "ann", "Chess", now=1) == "ok"
+    assert history.admit("move", "ann", "Cooking", now=2) == "ok"
+
+
+def test_forgotten_command_can_be_retried():
+    history = CommandHistory()
+    assert history.admit("move", "ann", "Cooking", now=0) == "ok"
+    history.forget("move", "ann")
+    assert history.admit("move", "ann", "Cooking", now=1) == "ok"
+
+
+def test_rate_limit():
+    history = CommandHistory({"rate_limit": 2, "rate_window": 60})
+    assert history.admit("move", "ann", "A", now=0) == "ok"
+    assert history.admit("move", "ann", "B", now=1) == "ok"
+    assert history.admit("move", "ann", "C", now=2) == "rate limited"
+
+
+def test_failed_move_can_be_retried():
+    zm = FailingMeeting(fail=["ann"])
+    for user in ("ann", "bob"):
+        assert zm.history.admit("move", user, "Cooking") == "ok"
+
+    assert make_moves(zm, [("ann", "Cooking"), ("bob", "Cooking")]) == {"ann": False, "bob": True}
+    assert zm.history.admit("move", "ann", "Cooking") == "ok"
+    assert zm.history.admit("move", "bob", "Cooking") == "repeat"
+
+
+def test_invalid_move_can_be_retried():
+    zm = FailingMeeting(invalid=["ann"])
+    assert zm.history.admit("move", "ann", "Cookng") == "ok"
+
+    assert make_moves(zm, [("ann", "Cookng")]) == dict()
+    assert zm.history.admit("move", "ann", "Cookng") == "ok"
+
+
+def test_state_round_trip():
+    history = CommandHistory()
+    history.add_broadcast("hello")
+    history.admit("move", "ann", "Cooking")
+
+    restored = CommandHistory()
+    restored.restore(history.state())
+    assert restored.broadcast_seen("hello")
+    assert restored.admit("move", "ann", "Cooking") == "repeat"
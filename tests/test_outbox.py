@@ -0,0 +1,57 @@
+from outbox import ChatOutbox
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def new_outbox(**outbox_params):
+    clock = Clock()
+    return ChatOutbox(outbox_params, clock), clock
+
+
+def test_duplicates_dropped_within_window():
+    outbox, clock = new_outbox(dedupe_window=30)
+    assert outbox.add("ann already in Cooking")
+    assert not outbox.add("ann already in Cooking")
+    clock.now += 30
+    assert outbox.add("ann already in Cooking")
+    assert outbox.stats()["dropped"] == 1
+
+
+def test_rate_limit():
+    outbox, clock = new_outbox(min_interval=1)
+    outbox.add("first")
+    assert outbox.ready()
+    outbox.take()
+
+    outbox.add("second")
+    assert not outbox.ready()
+    assert outbox.ready(force=True)
+    clock.now += 1
+    assert outbox.ready()
+
+
+def test_take_is_bounded_and_in_order():
+    outbox, _ = new_outbox(max_lines=2)
+    for line in ("a", "b", "c"):
+        outbox.add(line)
+    assert outbox.take() == ["a", "b"]
+    assert outbox.take() == ["c"]
+    assert not outbox.ready(force=True)
+
+
+def test_requeue_puts_lines_back_in_front():
+    outbox, _ = new_outbox()
+    outbox.add("a")
+    outbox.add("b")
+    taken = outbox.take()
+    outbox.add("c")
+    outbox.requeue(taken)
+    assert outbox.lines == ["a", "b", "c"]
+    assert outbox.stats()["posts"] == 0
+    assert outbox.stats()["requeued"] == 2
@@ -0,0 +1,40 @@
+from roster_index import RosterIndex
+
+
+def snapshot(rooms):
+    return {room_name: {"attendees": attendees} for room_name, attendees in rooms.items()}
+
+
+def test_first_snapshot_reports_everyone_as_joined():
+    roster = RosterIndex()
+    changes = roster.apply_snapshot(snapshot({"Unassigned": ["ann"], "Cooking": ["bob"]}))
+    assert sorted(changes) == [("ann", None, "Unassigned"), ("bob", None, "Cooking")]
+    assert roster.location("bob") == "Cooking"
+    assert roster.counts() == {"Unassigned": 1, "Cooking": 1}
+
+
+def test_snapshot_diff_reports_moves_and_leavers():
+    roster = RosterIndex()
+    roster.apply_snapshot(snapshot({"Unassigned": ["ann", "cat"], "Cooking": ["bob"]}))
+    changes = roster.apply_snapshot(snapshot({"Unassigned": [], "Cooking": ["bob", "ann"]}))
+    assert sorted(changes) == [("ann", "Unassigned", "Cooking"), ("cat", "Unassigned", None)]
+    assert roster.location("cat") is None
+    assert roster.members("Cooking") == ["bob", "ann"]
+
+
+def test_unchanged_snapshot_reports_nothing():
+    roster = RosterIndex()
+    rooms = snapshot({"Cooking": ["bob"]})
+    roster.apply_snapshot(rooms)
+    assert roster.apply_snapshot(rooms) == []
+
+
+def test_apply_move_ahead_of_snapshot():
+    roster = RosterIndex()
+    roster.apply_snapshot(snapshot({"Unassigned": ["ann"], "Cooking": []}))
+    roster.apply_move("ann", "Cooking")
+    assert roster.location("ann") == "Cooking"
+    assert roster.members("Unassigned") == []
+
+    # The next snapshot agrees with the move, so there is nothing to report
+    assert roster.apply_snapshot(snapshot({"Unassigned": [], "Cooking": ["ann"]})) == []
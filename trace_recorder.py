@@ -0,0 +1,78 @@
+"""
+Recording of what the bot saw during a meeting, for replaying offline with replay.py. Every batch of chat lines read and
+every change in the breakout room roster is appended to a JSONL trace file with the time it was seen
+"""
+
+import json
+import time
+
+
+class TraceRecorder(object):
+    """
+    Appends records to path, one compact JSON object per line:
+    - {"t": time, "kind": "chat", "events": [{"author": str, "line": str, "time": float}, ...]}
+    - {"t": time, "kind": "roster", "rooms": {room name: [attendees], ...}}, only when the roster has changed
+
+    Each record is flushed as it is written, so a crash loses at most the record being written
+    """
+
+    def __init__(self, path):
+        self.path           = path
+        self.handle         = open(path, "a")
+        self.last_rooms     = None
+        self.records        = 0
+
+    def write(self, record):
+        """
+        Appends record with the current time
+        :param record: dict
+        :return:
+        """
+
+        self.handle.write(json.dumps(dict(record, t=time.time()), separators=(",", ":")) + "\n")
+        self.handle.flush()
+        self.records += 1
+
+    def chat(self, events):
+        """
+        Records a batch of chat lines
+        :param events: result of ZoomMeeting.drain_chat_events or read_new_chat_lines
+        :return:
+        """
+
+        if events:
+            self.write({"kind": "chat", "events": [{"author": event["author"], "line": event["line"],
+                                                    "time": event["time"]} for event in events]})
+
+    def roster(self, snapshot):
+        """
+        Records the roster if it differs from the last one recorded
+        :param snapshot: result of ZoomMeeting.roster_snapshot
+        :return:
+        """
+
+        rooms = {room_name: list(room["attendees"]) for room_name, room in snapshot.items()}
+        if rooms != self.last_rooms:
+            self.write({"kind": "roster", "rooms": rooms})
+            self.last_rooms = rooms
+
+    def close(self):
+        self.handle.close()
+
+
+def load_trace(path):
+    """
+    Reads a trace file. A partly written last line, e.g. from a crash, is skipped
+    :param path:
+    :return: list of records, oldest first
+    """
+
+    records = []
+    with open(path) as handle:
+        for line in handle:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f"Skipping unreadable trace line: {line[:80]!r}")
+
+    return sorted(records, key=lambda record: record["t"])
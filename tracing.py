@@ -0,0 +1,231 @@
+"""
+Per-command latency tracing. Each chat command carries a trace of when it was seen in chat, parsed, validated, located
+and executed, and how many WebDriver calls each stage made. Finished traces feed rolling latency percentiles, which are
+written out as a Prometheus textfile, and are appended to a JSONL trace log
+"""
+
+import os
+import json
+import time
+from collections import deque
+
+STAGES      = ["parsed", "validated", "located", "executed"]
+QUANTILES   = [0.5, 0.95, 0.99]
+
+
+def percentile(ordered, q):
+    """
+    Nearest-rank percentile
+    :param ordered: sorted list of numbers
+    :param q: quantile between 0 and 1
+    :return: value, or None if ordered is empty
+    """
+
+    if not ordered:
+        return None
+    rank = max(int(round(q * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def write_atomically(path, text, sync=False):
+    """
+    Writes text to path through a temporary file so that readers never see a half-written file
+    :param path:
+    :param text:
+    :param sync: if True, the file is flushed to disk before it replaces path, so it also survives a power cut
+    :return:
+    """
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as handle:
+        handle.write(text)
+        if sync:
+            handle.flush()
+            os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+class CommandTracer(object):
+    """
+    Tracks open command traces, keyed by (command, user), and rolling windows of the most recent finished ones.
+
+    Stage latencies are measured from the previous mark, so "validated" is the time spent validating after parsing.
+    "total" runs from when the command was seen in chat to when it finished. call_count is a function returning the
+    total number of WebDriver calls made so far and is sampled at every mark
+    """
+
+    def __init__(self, trace_params=None, call_count=None):
+        trace_params            = trace_params or dict()
+        window                  = trace_params.get("window", 1000)
+        self.metrics_path       = trace_params.get("metrics_path")
+        self.trace_log_path     = trace_params.get("trace_log_path")
+        self.export_interval    = trace_params.get("export_interval", 10)
+        self.call_count         = call_count or (lambda: 0)
+        self.open_traces        = dict()
+        self.latencies          = {stage: deque(maxlen=window) for stage in STAGES + ["total"]}
+        self.calls              = {stage: deque(maxlen=window) for stage in STAGES + ["total"]}
+        self.finished_counts    = dict()
+        self.unwritten          = []
+        self.last_export        = time.time()
+
+    def start(self, command, user, argument, seen=None):
+        """
+        Opens a trace. A trace still open for the same (command, user) is finished as "superseded", since only the
+        latest command from each user is acted on
+        :param command: "move" or "broadcast"
+        :param user: author of the command
+        :param argument: target room or broadcast text
+        :param seen: time.time() at which the command was seen in chat. Defaults to now
+        :return:
+        """
+
+        key = (command, user)
+        if key in self.open_traces:
+            self.finish(command, user, "superseded")
+
+        if seen is None:
+            seen = time.time()
+
+        calls = self.call_count()
+        self.open_traces[key] = {"command": command,
+                                 "user": user,
+                                 "argument": argument,
+                                 "seen": seen,
+                                 "marks": dict(),
+                                 "calls": dict(),
+                                 "last_time": seen,
+                                 "last_calls": calls,
+                                 "start_calls": calls}
+
+    def mark(self, command, user, stage):
+        """
+        Records that the trace for (command, user) reached stage
+        :param command:
+        :param user:
+        :param stage: one of STAGES
+        :return:
+        """
+
+        trace = self.open_traces.get((command, user))
+        if trace is not None:
+            self.mark_trace(trace, stage)
+
+    def mark_trace(self, trace, stage):
+        """
+        Records the time and WebDriver calls since the trace's previous mark against stage
+        :param trace: open trace
+        :param stage: one of STAGES
+        :return:
+        """
+
+        now = time.time()
+        calls = self.call_count()
+        trace["marks"][stage] = now - trace["last_time"]
+        trace["calls"][stage] = calls - trace["last_calls"]
+        trace["last_time"] = now
+        trace["last_calls"] = calls
+
+    def finish(self, command, user, status="ok"):
+        """
+        Closes the trace for (command, user). Only traces with status "ok" are marked as executed and counted in the
+        latency windows
+        :param command:
+        :param user:
+        :param status: "ok", or a short reason the command was not carried out
+        :return:
+        """
+
+        trace = self.open_traces.pop((command, user), None)
+        if trace is None:
+            return
+
+        if status == "ok":
+            self.mark_trace(trace, "executed")
+            for stage in STAGES:
+                if stage in trace["marks"]:
+                    self.latencies[stage].append(trace["marks"][stage])
+                    self.calls[stage].append(trace["calls"][stage])
+            self.latencies["total"].append(trace["last_time"] - trace["seen"])
+            self.calls["total"].append(trace["last_calls"] - trace["start_calls"])
+
+        count_key = (command, status)
+        self.finished_counts[count_key] = self.finished_counts.get(count_key, 0) + 1
+
+        self.unwritten.append({"command": command,
+                               "user": user,
+                               "argument": trace["argument"],
+                               "status": status,
+                               "seen": trace["seen"],
+                               "total": time.time() - trace["seen"],
+                               "stages": trace["marks"],
+                               "webdriver_calls": trace["calls"]})
+
+    def summary(self):
+        """
+        Returns the rolling percentiles
+        :return: dict of stage -> {"count": int, "latency": {quantile: seconds}, "webdriver_calls": {quantile: calls}}
+        """
+
+        summary = dict()
+        for stage in STAGES + ["total"]:
+            latencies = sorted(self.latencies[stage])
+            calls = sorted(self.calls[stage])
+            summary[stage] = {"count": len(latencies),
+                              "latency": {q: percentile(latencies, q) for q in QUANTILES},
+                              "webdriver_calls": {q: percentile(calls, q) for q in QUANTILES}}
+        return summary
+
+    def prometheus_text(self):
+        """
+        Formats the rolling percentiles and finished command counts in the Prometheus text exposition format
+        :return: str
+        """
+
+        summary = self.summary()
+        lines = ["# HELP zoombot_command_latency_seconds Command latency by stage over the most recent commands",
+                 "# TYPE zoombot_command_latency_seconds summary"]
+        for stage, stats in summary.items():
+            for q, value in stats["latency"].items():
+                if value is not None:
+                    lines.append(f'zoombot_command_latency_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'zoombot_command_latency_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+        lines += ["# HELP zoombot_command_webdriver_calls WebDriver calls per command by stage",
+                  "# TYPE zoombot_command_webdriver_calls summary"]
+        for stage, stats in summary.items():
+            for q, value in stats["webdriver_calls"].items():
+                if value is not None:
+                    lines.append(f'zoombot_command_webdriver_calls{{stage="{stage}",quantile="{q}"}} {value}')
+
+        lines += ["# HELP zoombot_commands_total Finished commands by outcome",
+                  "# TYPE zoombot_commands_total counter"]
+        for (command, status), count in sorted(self.finished_counts.items()):
+            lines.append(f'zoombot_commands_total{{command="{command}",status="{status}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """
+        Writes the Prometheus textfile and appends finished traces to the trace log, for whichever paths are set
+        :return:
+        """
+
+        if self.metrics_path is not None:
+            write_atomically(self.metrics_path, self.prometheus_text())
+
+        if self.trace_log_path is not None and self.unwritten:
+            with open(self.trace_log_path, "a") as handle:
+                for trace in self.unwritten:
+                    handle.write(json.dumps(trace) + "\n")
+
+        self.unwritten = []
+        self.last_export = time.time()
+
+    def maybe_export(self):
+        """
+        Exports if export_interval seconds have passed since the last export. Called once per loop
+        :return:
+        """
+
+        if time.time() - self.last_export >= self.export_interval:
+            self.export()
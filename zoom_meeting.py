@@ -1,6 +1,4 @@
-import re
 import time
-import pickle as pk
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -8,7 +6,22 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from helper_functions import ParticipantNotFoundException, RoomIndexNotFoundException
+from helper_functions import SetupFailedException
+from move_planner import plan_moves, group_by_target
+from tracing import CommandTracer
+from driver_profiler import DriverProfiler
+from locator_cache import LocatorCache
+from command_grammar import CommandGrammar, RoomIndex
+from roster_index import RosterIndex
+from checkpoint import save_checkpoint, load_checkpoint
+from setup_pipeline import SetupStep, SetupPipeline
+from room_manifest import load_manifest, verify_manifest
+from staging import PreassignmentStage
+from outbox import ChatOutbox
+from history import CommandHistory
+from trace_recorder import TraceRecorder
+from zoom_scripts import CHAT_SNAPSHOT_JS, ROSTER_SNAPSHOT_JS, INSTALL_CHAT_OBSERVER_JS, DRAIN_CHAT_EVENTS_JS, \
+    PROBE_ELEMENT_JS, UI_STATE_JS, MOVE_ATTENDEE_JS, SETUP_STATE_JS, RENAME_ROOMS_JS, POST_CHAT_JS, ASSIGN_USERS_JS
 from urllib3.exceptions import MaxRetryError
 
 
@@ -17,46 +30,92 @@ class ZoomMeeting(object):
     Container to hold all the main operations of handling a zoom meeting. self.d is the chromedriver and holds all the
     DOM information. This is what you need to manipulate to access the webpage
 
-    user_locs is a dictionary that stores the last known breakout room location of users, indexed by user name
+    roster is a RosterIndex holding the breakout room location of users. It is brought up to date by every
+    roster_snapshot and by the bot's own moves
     """
 
     move_phrase         = "AssignMeTo: "
     broadcast_phrase    = "Broadcast: "
-    command_history     = []
-    user_locs           = dict()
-    broadcast_history   = []
-    n_most_recent       = [[], []]
     very_long_wait      = 20  # seconds
     long_wait           = 4  # seconds
     short_wait          = 0  # seconds
+    move_timeout        = 2  # seconds
+    locator_ttl         = 60  # seconds
 
     ZOOM_SIGNIN_PATH    = "https://zoom.us/signin"
     ZOOM_START_PATH     = "https://zoom.us/start/webmeeting"
     ZOOM_PROFILE_PATH   = "https://zoom.us/profile"
     ZOOM_MEETINGS_PATH  = "https://zoom.us/meeting"
+    PROBE_BY_TAGS       = {By.XPATH, By.CLASS_NAME, By.ID, By.NAME, By.CSS_SELECTOR}
 
     def __init__(self, meeting_params):
+        self.webdriver_calls = 0
+        self.profiler       = None
+        self.locators       = LocatorCache(lambda: self.d, self.locator_ttl)
         self.d              = None
         self.room_names     = meeting_params["room_names"]
+        self.manifest       = None
         self.SESSION_PATH   = meeting_params["SESSION_PATH"]
         self.CHROME_PATH    = meeting_params["CHROME_PATH"]
         self.username       = meeting_params["username"]
         self.password       = meeting_params["password"]
         self.meeting_docs   = meeting_params["meeting_docs"]
 
+        # A room manifest replaces room_names
+        if meeting_params.get("room_manifest") is not None:
+            self.manifest   = load_manifest(meeting_params["room_manifest"])
+            self.room_names = [room["name"] for room in self.manifest]
+
+        self.grammar        = CommandGrammar({"move": self.move_phrase, "broadcast": self.broadcast_phrase})
+        self.room_index     = RoomIndex(self.room_names)
+        self.roster         = RosterIndex()
+        self.assign_labels  = None  # names listed in the last assign dialog opened, see assign_users_before_start
+        self.chat_seq       = 0
+        self.chat_cursor    = None
+        self.tracer         = CommandTracer(meeting_params.get("trace_params"), lambda: self.webdriver_calls)
+        self.outbox         = ChatOutbox(meeting_params.get("outbox_params"))
+        self.history        = CommandHistory(meeting_params.get("history_params"))
+        self.recorder       = None
+        if meeting_params.get("record_path") is not None:
+            self.recorder   = TraceRecorder(meeting_params["record_path"])
+        self.session_info   = None
+        self.setup_complete = False
+        self.setup_steps_done   = set()
+        self.setup_params       = meeting_params.get("setup_params", dict())
+        self.checkpoint_interval    = meeting_params.get("checkpoint_interval", 5)
+        self.last_checkpoint        = 0
+        self.last_checkpoint_state  = None
+
+        self.staging = None
+        staging_params = meeting_params.get("staging_params")
+        if staging_params is not None and staging_params.get("enabled"):
+            self.staging = PreassignmentStage(staging_params)
+            for room in self.manifest or []:
+                for attendee in room["attendees"]:
+                    self.staging.add(attendee, room["name"])
+
+        profile_params = meeting_params.get("profile_params")
+        if profile_params is not None and profile_params.get("enabled"):
+            self.profiler = DriverProfiler(profile_params)
+
     def set_driver_from_file(self):
         """
-        Restarts ZoomBot using session information stored at SESSION_PATH. Sets self.d as driver from file
+        Restarts ZoomBot using the checkpoint stored at SESSION_PATH. Sets self.d as driver from file and restores the
+        chat position, roster and histories saved with it
         """
 
-        with open(self.SESSION_PATH, "rb") as handle:
-            session_info = pk.load(handle)
+        checkpoint = load_checkpoint(self.SESSION_PATH)
+        if checkpoint is None or checkpoint.get("session") is None:
+            raise FileNotFoundError(f"No session checkpoint at {self.SESSION_PATH}")
 
+        session_info = checkpoint["session"]
         driver = webdriver.Remote(command_executor=session_info["url"], desired_capabilities={})
         driver.close()  # this prevents the dummy browser
         driver.session_id = session_info["session_id"]
 
+        self.session_info = session_info
         self.d = driver
+        self.restore_checkpoint(checkpoint)
         self.set_global_driver_settings()
 
     def set_global_driver_settings(self):
@@ -76,15 +135,110 @@ class ZoomMeeting(object):
         driver = webdriver.Chrome(self.CHROME_PATH)
 
         # Save session info
-        session_info = {"url": driver.command_executor._url,
-                        "session_id": driver.session_id}
-
-        with open(self.SESSION_PATH, "wb") as handle:
-            pk.dump(session_info, handle)
-
+        self.session_info = {"url": driver.command_executor._url,
+                             "session_id": driver.session_id}
         self.d = driver
+        self.checkpoint()
         self.set_global_driver_settings()
 
+    def checkpoint_state(self):
+        """
+        Returns everything needed to pick up after a restart
+        :return: JSON-compatible dict
+        """
+
+        return {"session": self.session_info,
+                "setup_complete": self.setup_complete,
+                "setup_steps_done": sorted(self.setup_steps_done),
+                "chat_seq": self.chat_seq,
+                "chat_cursor": None if self.chat_cursor is None else list(self.chat_cursor),
+                "roster": {room_name: list(members) for room_name, members in self.roster.rooms.items()},
+                "history": self.history.state(),
+                "staging": None if self.staging is None else {"pending": dict(self.staging.pending),
+                                                              "applied": dict(self.staging.applied),
+                                                              "opened": self.staging.opened}}
+
+    def restore_checkpoint(self, checkpoint):
+        """
+        Restores the state saved by checkpoint_state
+        :param checkpoint: result of checkpoint.load_checkpoint
+        :return:
+        """
+
+        self.setup_complete     = checkpoint.get("setup_complete", False)
+        self.setup_steps_done   = set(checkpoint.get("setup_steps_done", []))
+        self.chat_seq           = checkpoint.get("chat_seq", 0)
+        self.chat_cursor        = checkpoint.get("chat_cursor")
+        self.history.restore(checkpoint.get("history", dict()))
+        if self.staging is not None and checkpoint.get("staging") is not None:
+            self.staging.pending.update(checkpoint["staging"]["pending"])
+            self.staging.applied.update(checkpoint["staging"]["applied"])
+            self.staging.opened = checkpoint["staging"]["opened"]
+        self.roster.apply_snapshot({room_name: {"attendees": members}
+                                    for room_name, members in checkpoint.get("roster", dict()).items()})
+
+    def reset_meeting_state(self):
+        """
+        Forgets the setup steps, chat position, roster and opened rooms restored from a checkpoint, for when setup
+        starts on a page that is not the checkpointed meeting. Staged assignments are kept and staged again
+        :return:
+        """
+
+        self.setup_complete     = False
+        self.setup_steps_done   = set()
+        self.chat_seq           = 0
+        self.chat_cursor        = None
+        self.roster             = RosterIndex()
+        if self.staging is not None:
+            self.staging.restart()
+
+    def memory_report(self):
+        """
+        Returns the sizes of the in-memory stores that grow with the meeting, for checking that memory use stays flat
+        over a long event, and the locator cache's hit counts
+        :return: dict
+        """
+
+        report = {"history": self.history.memory(),
+                  "roster_users": len(self.roster.locations),
+                  "outbox": self.outbox.stats(),
+                  "open_traces": len(self.tracer.open_traces),
+                  "locators": self.locators.stats()}
+
+        try:
+            import resource
+            report["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:  # not available on Windows
+            pass
+
+        return report
+
+    def checkpoint(self):
+        """
+        Writes the checkpoint to SESSION_PATH if the state has changed since the last write. Nothing is written if
+        SESSION_PATH is None, e.g. in replays and benchmarks
+        :return:
+        """
+
+        if self.SESSION_PATH is None:
+            return
+
+        state = self.checkpoint_state()
+        if state != self.last_checkpoint_state:
+            save_checkpoint(self.SESSION_PATH, state)
+            self.last_checkpoint_state = state
+        self.last_checkpoint = time.time()
+
+    def maybe_checkpoint(self, force=False):
+        """
+        Checkpoints if checkpoint_interval seconds have passed since the last one. Called once per loop
+        :param force: checkpoint now, e.g. right after commands were handled
+        :return:
+        """
+
+        if force or time.time() - self.last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
     def logged_in(self):
         """
         Returns True if the user is logged in
@@ -131,31 +285,134 @@ class ZoomMeeting(object):
 
     def send_message_to_chat(self, message):
         """
-        Sends the string message to chat
+        Queues the string message for the chat. Queued messages are posted together by flush_chat
         :param message:
         :return:
         """
 
-        self.d.find_element_by_class_name("chat-box__chat-textarea").send_keys(message)
-        self.d.find_element_by_class_name("chat-box__chat-textarea").send_keys(Keys.RETURN)
+        self.outbox.add(message)
+
+    def flush_chat(self, force=False):
+        """
+        Posts the queued chat messages as one message, if the outbox's rate limit allows it. Called once per loop
+        :param force: post now regardless of the rate limit, e.g. when setup is finished
+        :return: True if anything was posted
+        """
+
+        if not self.outbox.ready(force):
+            return False
+
+        messages = self.outbox.take()
+        if self.post_to_chat("\n".join(messages)):
+            return True
+
+        # Keep the messages for the next flush, e.g. after the chat has been reopened
+        self.outbox.requeue(messages)
+        return False
+
+    def post_to_chat(self, message):
+        """
+        Sends the string message to chat straight away, in one execute_script call
+        :param message: may have several lines, which are posted as one chat message
+        :return: True if the chat was open
+        """
+
+        posted = self.d.execute_script(POST_CHAT_JS, message)
+        if not posted:
+            print(f"Chat is not open. Could not post: {message}")
+        return posted
+
+    def chat_snapshot(self, n):
+        """
+        Reads the n most recent chat items in a single execute_script call. Each item is a dict with keys "idx" (the
+        item's position in the whole chat list), "author" and "message"
+        :param n: number of items to read. n <= 0 reads the whole chat
+        :return: list of dicts, oldest first
+        """
+
+        return self.d.execute_script(CHAT_SNAPSHOT_JS, n)
 
-    def get_n_most_recent_chat_messages(self, n):
+    def install_chat_observer(self):
         """
-        Retrieves the n most recent messages from the chat
-        :param n:
+        Injects a MutationObserver into the meeting page that queues every new chat line with a sequence number. Lines
+        already in the chat are not queued
         :return:
         """
 
-        chat_items = self.d.find_elements_by_class_name("chat-item__chat-info")[-n:]
+        if self.d.execute_script(INSTALL_CHAT_OBSERVER_JS):
+            print("Chat observer installed")
+            self.chat_seq = 0
+
+    def drain_chat_events(self):
+        """
+        Empties the in-page chat queue in one execute_script call. The observer is (re)installed if the page no longer
+        has one, in which case nothing is returned this time. Events at or below self.chat_seq are dropped so that no
+        line is handled twice
+        :return: list of dicts with keys "seq", "author", "line" and "time" (when the line appeared), oldest first
+        """
+
+        events = self.d.execute_script(DRAIN_CHAT_EVENTS_JS)
+        if events is None:
+            self.install_chat_observer()
+            return []
+
+        events = [event for event in events if event["seq"] > self.chat_seq]
+        if events:
+            self.chat_seq = events[-1]["seq"]
+
+        if self.recorder is not None:
+            self.recorder.chat(events)
+
+        return events
+
+    def read_new_chat_lines(self, n):
+        """
+        Polling alternative to drain_chat_events. Reads the n most recent chat items and returns the command lines that
+        are past self.chat_cursor, a [chat item index, line offset] pair marking the last line handled. Zoom merges
+        consecutive messages from one author into a single item, so the line offset picks up where the previous read of
+        that item stopped
+
+        The first call only places the cursor at the end of the chat. Raise n if bursts of commands are being missed
+        :param n: number of chat items to read
+        :return: list of dicts with keys "idx", "offset", "author", "line" and "time", oldest first
+        """
+
+        items = self.chat_snapshot(n)
+        if not items:
+            return []
+
+        if self.chat_cursor is None:
+            self.chat_cursor = [items[-1]["idx"], len(items[-1]["message"].splitlines())]
+            return []
+
+        cursor_idx, cursor_offset = self.chat_cursor
+        if items[-1]["idx"] < cursor_idx:
+            print("Chat is shorter than at the last read, so the page was reloaded. Reading it from the start")
+            cursor_idx, cursor_offset = -1, 0
+
+        if items[0]["idx"] > cursor_idx + 1:
+            print(f"Chat moved {items[0]['idx'] - cursor_idx - 1} items past the last read. Consider raising N")
+
+        lines = []
+        for item in items:
+            if item["idx"] < cursor_idx:
+                continue
+
+            start = cursor_offset if item["idx"] == cursor_idx else 0
+            item_lines = item["message"].splitlines()
 
-        authors     = []
-        messages    = []
+            for offset in range(start, len(item_lines)):
+                line = item_lines[offset]
+                if self.move_phrase in line or self.broadcast_phrase in line:
+                    lines.append({"idx": item["idx"], "offset": offset, "author": item["author"], "line": line,
+                                  "time": time.time()})
 
-        for item in chat_items:
-            authors.append(item.find_element_by_xpath(".//div[1]/span[1]").get_attribute("innerText").strip())
-            messages.append(item.find_element_by_xpath(".//pre[1]").get_attribute("innerText"))
+            self.chat_cursor = [item["idx"], max(start, len(item_lines))]
 
-        return authors, messages
+        if self.recorder is not None:
+            self.recorder.chat(lines)
+
+        return lines
 
     def open_participants_pane(self):
         """
@@ -183,9 +440,12 @@ class ZoomMeeting(object):
                 self.d.find_element_by_id("moreButton").click()
                 self.d.find_element_by_xpath('//a[@aria-label="Breakout Rooms"]').click()
 
+            self.locators.invalidate()
+
     def set_up_breakout_rooms(self):
         """
-        Sets the number and names of the breakout rooms
+        Sets the number and names of the breakout rooms, and makes the pre-assignments in the room manifest if there is
+        one
         :return:
         """
 
@@ -200,21 +460,99 @@ class ZoomMeeting(object):
             self.d.find_element_by_xpath('//div[@aria-label="Manually"]').click()
             self.d.find_element_by_class_name("bo-createwindow-content__actions").\
                 find_element_by_xpath('.//button[2]').click()
+            self.locators.invalidate()
 
-            # Rename rooms according to room_names
-            bo_room_list_container = self.d.find_element_by_class_name("bo-room-list-container")
+            self.name_rooms()
 
-            for i, name in enumerate(self.room_names):
-                bo_room = bo_room_list_container.find_element_by_xpath(f".//ul/li[{i + 1}]")
-                content = bo_room.find_element_by_xpath(".//div/div/div")
+            if self.manifest is not None:
+                self.provision_from_manifest()
+
+    def name_rooms(self):
+        """
+        Renames the rooms according to room_names. All rooms are renamed in one execute_async_script call and the names
+        are then read back. Any room that still has the wrong name, e.g. because the script timed out, is renamed again
+        with mouse actions
+        :return: list of room names that could not be set
+        """
+
+        # Each room can wait long_wait at each of its three steps, which for many rooms is well past chromedriver's
+        # default script timeout
+        self.d.set_script_timeout(3 * self.long_wait * len(self.room_names) + self.very_long_wait)
+        try:
+            results = self.d.execute_async_script(RENAME_ROOMS_JS, self.room_names, self.long_wait * 1000)
+        except TimeoutException:
+            print("Renaming rooms in bulk timed out")
+            results = None
+
+        if results is not None:
+            for name, reason in zip(self.room_names, results):
+                if reason is not None:
+                    print(f"Renaming {name} in bulk failed: {reason}")
+
+        titles = self.room_titles()
+        unnamed = []
+        for i, name in enumerate(self.room_names):
+            if i < len(titles) and titles[i] == name:
+                continue
+            try:
+                self.rename_room(i, name)
+            except NoSuchElementException as e:
+                print(str(e))
+                unnamed.append(name)
+
+        return unnamed
+
+    def room_titles(self):
+        """
+        Returns the titles of the items in the breakout room list, in order, without expanding any rooms
+        :return: list of str
+        """
+
+        return [room["name"] for room in self.d.execute_script(ROSTER_SNAPSHOT_JS, False)]
+
+    def rename_room(self, i, name):
+        """
+        Renames the room at 0-based position i of the room list with mouse actions
+        :param i:
+        :param name:
+        :return:
+        """
 
-                # Mouse over correct room and click rename
-                ActionChains(self.d).move_to_element(content).click().perform()
-                ActionChains(self.d).move_to_element(content.find_element_by_xpath(".//button[1]")).click().perform()
+        bo_room_list_container = self.d.find_element_by_class_name("bo-room-list-container")
+        bo_room = bo_room_list_container.find_element_by_xpath(f".//ul/li[{i + 1}]")
+        content = bo_room.find_element_by_xpath(".//div/div/div")
 
-                # Type in new name and confirm
-                self.d.find_element_by_class_name('confirm-tip__tip').find_element_by_xpath(".//input").send_keys(name)
-                self.d.find_element_by_class_name('confirm-tip__footer').find_element_by_xpath('.//button[1]').click()
+        # Mouse over correct room and click rename
+        ActionChains(self.d).move_to_element(content).click().perform()
+        ActionChains(self.d).move_to_element(content.find_element_by_xpath(".//button[1]")).click().perform()
+
+        # Type in new name and confirm
+        self.d.find_element_by_class_name('confirm-tip__tip').find_element_by_xpath(".//input").send_keys(name)
+        self.d.find_element_by_class_name('confirm-tip__footer').find_element_by_xpath('.//button[1]').click()
+
+    def provision_from_manifest(self):
+        """
+        Assigns each room's pre-assigned attendees, one assign dialog per room, and checks the room list against the
+        manifest. Only valid before breakout rooms are started. Attendees who haven't joined yet are reported and left
+        :return: list of problems found, see room_manifest.verify_manifest
+        """
+
+        for room in self.manifest:
+            if room["attendees"]:
+                results = self.assign_users_before_start(room["attendees"], room["name"], notify=False)
+
+                # Only attendees who haven't joined yet are left for staging to assign
+                for attendee, assigned in results.items():
+                    if assigned and self.staging is not None:
+                        self.staging.mark_applied(attendee, room["name"])
+
+        problems = verify_manifest(self.manifest, self.roster_snapshot())
+        for problem in problems:
+            print(f"Room manifest: {problem}")
+        if not problems:
+            print(f"Room manifest: all {len(self.manifest)} rooms match")
+
+        return problems
 
     @property
     def d(self):
@@ -226,11 +564,31 @@ class ZoomMeeting(object):
 
     @d.setter
     def d(self, value):
+        """
+        Every WebDriver round trip, including those made through WebElements, goes through the driver's execute method,
+        so it is wrapped here to keep count of them in self.webdriver_calls and, if self.profiler is set, to time them
+        :param value:
+        :return:
+        """
+
+        if value is not None:
+            execute = value.execute
+
+            def counted_execute(driver_command, params=None):
+                self.webdriver_calls += 1
+                if self.profiler is None:
+                    return execute(driver_command, params)
+                return self.profiler.profile(execute, driver_command, params)
+
+            value.execute = counted_execute
+
         self._d = value
+        self.locators.invalidate()
 
     def check_if_exists(self, by_tag, link_tag, wait_time=None):
         """
-        Checks for the existence of a particular element on the DOM
+        Checks for the existence of a particular element on the DOM. With no wait time this is a single execute_script
+        call that never sits out the driver's implicit wait
         :param by_tag:
         :param link_tag:
         :param wait_time:
@@ -240,12 +598,25 @@ class ZoomMeeting(object):
         if wait_time is None:
             wait_time = self.short_wait
 
+        if wait_time == 0 and by_tag in self.PROBE_BY_TAGS:
+            elem = self.d.execute_script(PROBE_ELEMENT_JS, by_tag, link_tag)
+            return elem is not None, elem
+
         try:
-            WebDriverWait(self.d, wait_time).until(ec.presence_of_element_located((by_tag, link_tag)), "")
-            return True, self.d.find_element(by_tag, link_tag)
+            elem = WebDriverWait(self.d, wait_time).until(ec.presence_of_element_located((by_tag, link_tag)), "")
+            return True, elem
         except TimeoutException:
             return False, None
 
+    def ui_state(self):
+        """
+        Reads the parts of the meeting UI that are checked every tick in a single execute_script call
+        :return: dict with keys "help_window_open", "breakout_menu_open", "rooms_started" (None while the breakout room
+            menu is closed), "unassigned_present" and "chat_open"
+        """
+
+        return self.d.execute_script(UI_STATE_JS, self.room_names[0])
+
     def click_if_exists(self, by_tag, link_tag, wait_time=None):
         """
         Clicks a particular element if it exists in the DOM
@@ -270,15 +641,18 @@ class ZoomMeeting(object):
         self.click_if_exists(By.PARTIAL_LINK_TEXT, "join from your browser", self.long_wait)
         self.click_if_exists(By.ID, "btn_end_meeting", self.long_wait)
 
-    def move_is_valid(self, target_user, target_room):
+    def move_is_valid(self, target_user, target_room, incoming=0):
         """
         Determines whether a move is valid. Validity is defined as:
         - the target_user's name is not truncated
         - the target_room is either a valid name and
         - the target_user is not in the target_room already
+        - the target_room has room for the target_user, if it has a capacity
 
         :param target_user:
         :param target_room:
+        :param incoming: number of moves into target_room already accepted in the same batch, counted against its
+            capacity
         :return:
         """
 
@@ -287,7 +661,15 @@ class ZoomMeeting(object):
             return False
 
         if target_room in self.room_names:
-            if target_user not in self.room_participants(target_room):
+            already_there = self.roster.location(target_user) == target_room
+
+            capacity = self.room_capacity(target_room)
+            occupancy = len(self.roster.members(target_room)) + incoming
+            if not already_there and capacity is not None and occupancy >= capacity:
+                self.send_message_to_chat(f"{target_user} - {target_room} is full")
+                return False
+
+            if not already_there:
                 return True
             else:
                 self.send_message_to_chat(f"{target_user} already in {target_room}")
@@ -296,7 +678,26 @@ class ZoomMeeting(object):
         elif target_room.startswith("[CLASS NAME]"):
             pass
         else:
-            self.send_message_to_chat(f"{target_user} - {target_room} is not a valid name. Check spelling.")
+            suggestions = self.room_index.suggest(target_room)
+            if suggestions:
+                self.send_message_to_chat(f"{target_user} - {target_room} is not a valid name. "
+                                          f"Did you mean {' or '.join(suggestions)}?")
+            else:
+                self.send_message_to_chat(f"{target_user} - {target_room} is not a valid name. Check spelling.")
+
+    def room_capacity(self, room_name):
+        """
+        Returns the capacity given to room_name in the room manifest
+        :param room_name:
+        :return: int, or None if there is no manifest or no capacity for the room
+        """
+
+        if self.manifest is None:
+            return None
+        for room in self.manifest:
+            if room["name"] == room_name:
+                return room["capacity"]
+        return None
 
     def start_new_call(self):
         """
@@ -305,6 +706,7 @@ class ZoomMeeting(object):
         """
 
         self.d.get(self.ZOOM_START_PATH)
+        self.reset_meeting_state()
         self.set_up_call()
 
     def disable_screen_sharing(self):
@@ -326,27 +728,108 @@ class ZoomMeeting(object):
 
     def set_up_call(self):
         """
-        Sets up call for new or resumed calls, providing time for the user to dismiss popups and performs setup tasks
-        such as opening chat, and setting up breakout rooms
+        Sets up call for new or resumed calls, performing setup tasks such as opening chat, and setting up breakout
+        rooms. Each task runs as soon as the page is ready for it, see setup_steps. Raises SetupFailedException if a
+        required step failed, as the bot can't take commands without it
         :return:
         """
 
-        self.join_from_browser()
+        if not self.run_setup_pipeline():
+            raise SetupFailedException("Meeting setup failed, see the setup report above")
 
-        print(f"Waiting {self.very_long_wait} seconds for page...")
-        time.sleep(self.very_long_wait)
+    def setup_state(self):
+        """
+        Reads which one-off setup steps are already in effect on the page, and which controls are shown, in one
+        execute_script call
+        :return: dict, see zoom_scripts.SETUP_STATE_JS
+        """
+
+        return self.d.execute_script(SETUP_STATE_JS)
+
+    def run_once(self, name, fn):
+        """
+        Returns an action that runs fn and records name in self.setup_steps_done, for steps whose effect can't be read
+        from the page
+        :param name:
+        :param fn:
+        :return: function
+        """
+
+        def action():
+            fn()
+            self.setup_steps_done.add(name)
+
+        return action
 
-        self.dismiss_audio()
-        self.disable_video_receiving()
-        self.disable_screen_sharing()
-        self.open_chat()
-        self.open_participants_pane()
-        self.set_up_breakout_rooms()
-        self.send_message_to_chat(self.meeting_docs)
+    def setup_steps(self):
+        """
+        Returns the setup steps. Steps that can't be checked on the page are marked done in self.setup_steps_done,
+        which is checkpointed, so no step is repeated for a meeting that was already set up
+        :return: list of SetupStep
+        """
+
+        def once(name):
+            return lambda state: name in self.setup_steps_done
+
+        def join():
+            self.join_from_browser()
+            self.locators.invalidate()
+
+        def welcome():
+            if not self.post_to_chat(self.meeting_docs):
+                raise NoSuchElementException("Chat textarea not found")
+
+        # The audio prompt is modal, so steps that click on the page wait for it to be dismissed. Once the last of those
+        # steps is done the prompt no longer matters
+        in_meeting = lambda state: state["in_meeting"] and not state["audio_prompt"]
+        audio_done = lambda state: "dismiss_audio" in self.setup_steps_done or \
+            (not state["audio_prompt"] and "breakout_rooms" in self.setup_steps_done)
+        page_timeout = self.setup_params.get("page_timeout", 3 * self.very_long_wait)
+        step_timeout = self.setup_params.get("step_timeout", self.very_long_wait)
+        retries = self.setup_params.get("retries", 2)
+
+        return [
+            SetupStep("join", join, done=lambda state: state["in_meeting"], timeout=page_timeout, retries=retries),
+            SetupStep("dismiss_audio", self.run_once("dismiss_audio", self.dismiss_audio), after=["join"],
+                      ready=lambda state: state["audio_prompt"], done=audio_done, timeout=page_timeout,
+                      retries=retries, optional=True),
+            SetupStep("open_chat", self.open_chat, after=["join"], ready=in_meeting,
+                      done=lambda state: state["chat_open"], timeout=step_timeout, retries=retries),
+            SetupStep("chat_observer", self.install_chat_observer, after=["open_chat"],
+                      done=lambda state: state["chat_observer"], timeout=step_timeout, retries=retries),
+            SetupStep("disable_video", self.run_once("disable_video", self.disable_video_receiving), after=["join"],
+                      ready=lambda state: in_meeting(state) and state["more_button"], done=once("disable_video"),
+                      timeout=step_timeout, retries=retries, optional=True),
+            SetupStep("disable_sharing", self.run_once("disable_sharing", self.disable_screen_sharing),
+                      after=["join"], ready=lambda state: in_meeting(state) and state["share_menu"],
+                      done=once("disable_sharing"), timeout=step_timeout, retries=retries, optional=True),
+            SetupStep("open_participants", self.open_participants_pane, after=["join"],
+                      ready=lambda state: in_meeting(state) and state["participants_button"],
+                      done=lambda state: state["participants_open"], timeout=step_timeout, retries=retries),
+            SetupStep("breakout_rooms", self.run_once("breakout_rooms", self.set_up_breakout_rooms),
+                      after=["open_participants", "disable_video"],
+                      ready=lambda state: in_meeting(state) and state["more_button"], done=once("breakout_rooms"),
+                      timeout=step_timeout, retries=retries),
+            SetupStep("welcome", self.run_once("welcome", welcome), after=["chat_observer", "breakout_rooms"],
+                      done=once("welcome"), timeout=step_timeout, retries=retries, optional=True)]
+
+    def run_setup_pipeline(self):
+        """
+        Runs the setup steps, skipping any that are already done, and prints a timing report
+        :return: True if no required step failed
+        """
+
+        pipeline = SetupPipeline(self.setup_steps(), self.setup_state, self.setup_params.get("poll_interval", 0.25))
+        ok = pipeline.run()
+        print(pipeline.report())
 
         # Lower the implicit wait time
         self.d.implicitly_wait(self.short_wait)
 
+        self.setup_complete = ok
+        self.checkpoint()
+        return ok
+
     def add_driver(self, existing_meeting_id):
         """
         Determines if an existing meeting is still open and if so, tries to connect to the Chrome instance running that
@@ -385,6 +868,7 @@ class ZoomMeeting(object):
 
             if existing_meeting_id == meeting_id:
                 meeting.find_element_by_xpath('.//a[@ui-cmd="Start"]').click()
+                self.reset_meeting_state()
                 self.set_up_call()
                 return None
 
@@ -392,40 +876,39 @@ class ZoomMeeting(object):
 
     def resume_call(self):
         """
-        Determines whether setup of a Zoom meeting was complete by checking the window title. If incomplete, a new call
-        is started
+        Determines whether setup of a Zoom meeting was complete. A meeting this bot finished setting up before it
+        stopped is resumed without repeating setup. Otherwise the window title is checked and, if incomplete, a new call
+        is started. If the page is not in a meeting, it isn't the checkpointed one, so setup starts from scratch
         :return:
         """
 
-        if "Zoom Meeting" or "Polit University Online" in self.d.title:
+        in_meeting = self.setup_state()["in_meeting"]
+        if self.setup_complete and in_meeting:
+            print("Resuming call")
+            self.set_up_call()
+            return None
+
+        if not in_meeting:
+            self.reset_meeting_state()
+
+        if any(title in self.d.title for title in ("Zoom Meeting", "Polit University Online")):
             print("Setting up call")
             self.set_up_call()
         else:
             print("Starting new call")
             self.start_new_call()
 
-    def new_messages(self, aut_mess):
-        """
-        Returns true if [authors, messages] is different than self.n_most_recent
-        """
-
-        first_set = set(map(tuple, self.n_most_recent))
-        secnd_set = set(map(tuple, aut_mess))
-
-        return bool(first_set ^ secnd_set)
-    
-    def broadcast_message(self, message):
+    def broadcast_message(self, message, state=None):
         """
         Uses Zoom's broadcast feature to send the string message to all breakout rooms
         :param message:
-        :return:
+        :param state: result of ui_state earlier in the same tick, see breakout_rooms_started
+        :return: True if the message was broadcast, False if rooms are not started
         """
 
-        if self.breakout_rooms_started():
-            self.open_breakout_room_menu()
-            bc_button = self.d.find_element_by_class_name("bo-room-in-progress-footer__actions").\
-                find_element_by_xpath(".//button")
-            bc_button.click()
+        if self.breakout_rooms_started(state):
+            self.locators.with_element(By.CLASS_NAME, "bo-room-in-progress-footer__actions",
+                                       lambda actions: actions.find_element_by_xpath(".//button").click())
             textarea = self.d.find_element_by_class_name("bo-room-broadcast-paper__textarea")
             textarea.send_keys(message)
 
@@ -434,290 +917,281 @@ class ZoomMeeting(object):
             send_button.click()
 
             # Add to history to avoid rebroadcast
-            self.broadcast_history.append(message)
-
-    def extract_from_message(self, message, keyword):
-        """
-        Catches messages after a command phrase (Move Phrase or Broadcast Phrase) and zeros out any other command
-        phrases in the message
-        """
-
-        regexp  = r"(?<=" + keyword + ").+$"
-        match   = re.findall(regexp, message, re.MULTILINE)
-        message = match[-1]
-
-        clean_msg = message.replace(self.move_phrase, "").replace(self.broadcast_phrase, "").strip()
+            self.history.add_broadcast(message)
+            return True
 
-        return clean_msg
+        return False
 
-    def move_user_to_room(self, target_user, target_room):
+    def move_users_to_rooms(self, moves, snapshot=None, state=None):
         """
-        Attempts to move target_user to target_room. This procedure is different depending on whether or not breakout
-        rooms are currently "started"
+        Attempts to make a batch of moves. This procedure is different depending on whether or not breakout rooms are
+        currently "started"
 
-        This function searches the last known location of a user first to save time. If they are not found, it cycles
-        through all the breakout rooms (including the psuedo-room "Unassigned") until the user is found.
+        Before rooms are started, moves are added to self.staging if staging is enabled, see run_staging. Otherwise the
+        assign dialog of each target room is opened once for all of its users and the rooms are then started.
+        Afterwards, one roster snapshot tells which users are already in place or missing, and every other user is moved
+        with a single move_attendee call
 
-        :param target_user:
-        :param target_room:
-        :return:
+        :param moves: dict of target_user -> target_room
+        :param snapshot: result of roster_snapshot. A fresh one is taken if None
+        :param state: result of ui_state earlier in the same tick, see breakout_rooms_started
+        :return: dict of target_user -> True if the move was made
         """
 
-        bo_room_list_container  = self.d.find_element_by_class_name("bo-room-list-container")
+        results = dict()
+        if not moves:
+            return results
 
         # If rooms have not yet been opened
-        if not self.breakout_rooms_started():
-
-            # click assign
-            bo_room_list_container.find_element_by_xpath(
-                '//div[starts-with(@aria-label, "' + target_room + '")]/div[2]/button').click()
-            assign_list = self.d.find_element_by_class_name("bo-room-assign-list-scrollbar")
+        if not self.breakout_rooms_started(state):
+            if self.staging is not None and not self.staging.opened:
+                for target_user, target_room in moves.items():
+                    self.staging.add(target_user, target_room)
+                    self.tracer.finish("move", target_user, "staged")
+                    results[target_user] = True
+                return results
 
-            assignees = []
-            avail_assignees = self.d.find_elements_by_class_name("zmu-data-selector-item")
-            for assignee in avail_assignees:
-                assignees.append(assignee.find_element_by_xpath(".//span/span[2]/span").get_attribute("innerText"))
-
-            target_idx = assignees.index(target_user)
-            assign_list.find_element_by_xpath(f".//div/div/div[{target_idx+1}]").click()
+            for target_room, target_users in group_by_target(moves).items():
+                results.update(self.assign_users_before_start(target_users, target_room))
 
             self.start_breakout_rooms()
-            self.user_locs[target_user] = target_room
+            return results
 
         # If rooms have already been opened
-        else:
-            try:
-                lk_room_name = self.last_known_location(target_user)
-                lk_room_participants = self.room_participants(lk_room_name)
+        if snapshot is None:
+            snapshot = self.roster_snapshot()
+
+        groups, already_there, missing = plan_moves(moves, snapshot)
+        for target_user in moves:
+            self.tracer.mark("move", target_user, "located")
+
+        for target_user in already_there:
+            self.roster.apply_move(target_user, moves[target_user])
+            self.tracer.finish("move", target_user)
+            results[target_user] = True
+
+        for target_user in missing:
+            msg = f"Tried to move {target_user} to {moves[target_user]}. An error occurred. Did they move?"
+            self.send_message_to_chat(msg)
+            print(f"Target user: {target_user} not found")
+            self.tracer.finish("move", target_user, "not found")
+            results[target_user] = False
+
+        for source_room, group in groups:
+            for target_user, target_room in group:
+                result = self.move_attendee(target_user, target_room)
+                if result["ok"]:
+                    self.roster.apply_move(target_user, target_room)
+                    self.tracer.finish("move", target_user)
+                    results[target_user] = True
+                else:
+                    msg = f"Tried to move {target_user} to {target_room}. An error occurred. Did they move?"
+                    self.send_message_to_chat(msg)
+                    print(f"Moving {target_user} from {source_room} to {target_room} failed: {result['reason']}")
+                    self.tracer.finish("move", target_user, "failed")
+                    results[target_user] = False
+
+        print(f"Moved {sum(results.values())} of {len(results)} users")
+        return results
+
+    def move_attendee(self, target_user, target_room):
+        """
+        Finds target_user in the breakout room list, opens their move-to menu and clicks target_room, all in one
+        WebDriver call. Only valid after breakout rooms are started
+        :param target_user:
+        :param target_room:
+        :return: dict with "ok", "reason", "source" and "options", see zoom_scripts.MOVE_ATTENDEE_JS
+        """
 
-                if target_user not in lk_room_participants:
-                    lk_room_name = self.search_rooms_for_user(target_user)
+        return self.d.execute_async_script(MOVE_ATTENDEE_JS, target_user, target_room, self.move_timeout * 1000)
 
-                lk_room_idx = self.room_idx(lk_room_name, unassigned_incl=True)
-                curr_room = bo_room_list_container.find_element_by_xpath(f".//ul/li[{lk_room_idx}]")
-                attendees = curr_room.find_elements_by_class_name("bo-room-item-attendee")
-                attendee = attendees[self.attendee_idx(target_user, lk_room_name, start_at_zero=True)]
+    def assign_users_before_start(self, target_users, target_room, notify=True):
+        """
+        Opens the assign dialog of target_room once and selects every user in target_users, all in one WebDriver call.
+        Only valid before breakout rooms are started. Users already assigned to target_room are not clicked, as clicking
+        a ticked name in the dialog sends them back to Unassigned. Every name listed in the dialog is kept in
+        self.assign_labels
+        :param target_users: list of user names
+        :param target_room:
+        :param notify: if True, users who can't be found are told so in chat
+        :return: dict of target_user -> True if the user is assigned to target_room
+        """
 
-                self.assign_attendee_to_room(attendee, target_room, lk_room_name)
-                self.user_locs[target_user] = target_room
+        results = dict()
 
-            except (NoSuchElementException, ParticipantNotFoundException) as e:
-                msg = f"Tried to move {target_user} to {target_room}. An error occurred. Did they move?"
-                self.send_message_to_chat(msg)
-                print(str(e))
+        snapshot = self.roster_snapshot()
+        already_assigned = set(snapshot[target_room]["attendees"]) if target_room in snapshot else set()
+        to_click = [target_user for target_user in target_users if target_user not in already_assigned]
 
-    def search_rooms_for_user(self, target_user):
-        """
-        Cycles through rooms to locate target_user. The room where they are located is returned or
-        ParticipantNotFoundException is raised
-        """
+        result = self.d.execute_async_script(ASSIGN_USERS_JS, target_room, to_click, self.move_timeout * 1000)
+        if not result["ok"]:
+            raise NoSuchElementException(f"Assigning to {target_room} failed: {result['reason']}")
+        self.assign_labels = set(result["labels"])
+        clicked = set(result["clicked"])
+
+        for target_user in target_users:
+            if target_user in already_assigned:
+                self.tracer.finish("move", target_user)
+                results[target_user] = True
+                continue
 
-        if target_user in self.room_participants("Unassigned"):
-            return "Unassigned"
+            if target_user not in clicked:
+                if notify:
+                    self.send_message_to_chat(f"Tried to move {target_user} to {target_room}. An error occurred. "
+                                              f"Did they move?")
+                self.tracer.finish("move", target_user, "not found")
+                results[target_user] = False
+                continue
 
-        for test_room in self.room_names:
-            room_part = self.room_participants(test_room)
-            if target_user in room_part:
-                return test_room
+            self.tracer.mark("move", target_user, "located")
+            self.roster.apply_move(target_user, target_room)
+            self.tracer.finish("move", target_user)
+            results[target_user] = True
 
-        raise ParticipantNotFoundException(f"Target user: {target_user} not found")
+        return results
 
-    def room_participants(self, target_room):
+    def apply_staged(self):
         """
-        Returns a list of participants of target_room
-        :param target_room:
-        :return:
+        Makes the staged assignments on the page, opening the assign dialog once per room. Users who can't be found,
+        e.g. because they haven't joined yet, stay staged and are tried again next time. The first dialog opened lists
+        everyone in the meeting, so rooms none of whose users are listed in it are skipped without opening theirs
+        :return: number of assignments made
         """
 
-        if target_room == "Unassigned" and not self.unassigned_room_open():
-            return []
+        applied = 0
+        self.assign_labels = None
+        for target_room, target_users in self.staging.batches().items():
+            if self.assign_labels is not None and self.assign_labels.isdisjoint(target_users):
+                continue
 
-        if self.room_name_valid(target_room):
-            xpath = '//div[starts-with(@aria-label, "' + target_room + '")]'
-            room_banner = self.d.find_element_by_xpath(xpath)
-        else:
-            return []
-
-        if not (room_banner.get_attribute("aria-expanded") == 'true'):
-            room_banner.find_element_by_xpath('.//parent::div').click()
-            
-        bo_room = room_banner.find_element_by_xpath('.//parent::div//parent::li')
-        attendees = bo_room.find_elements_by_class_name("bo-room-item-attendee")
-        participants = []
+            try:
+                results = self.assign_users_before_start(target_users, target_room, notify=False)
+            except NoSuchElementException as e:
+                print(str(e))
+                continue
 
-        for attendee in attendees:
-            raw_name = attendee.find_element_by_xpath('.//span[starts-with(@class, "bo-room-item-attendee__name")]')
-            participants.append(raw_name.get_attribute('innerText'))
+            for target_user, assigned in results.items():
+                if assigned:
+                    self.staging.mark_applied(target_user, target_room)
+                    applied += 1
 
-        return participants
+        return applied
 
-    def breakout_rooms_started(self):
+    def run_staging(self):
         """
-        Returns True if breakout rooms have started
-        :return:
+        Applies staged assignments and opens the breakout rooms once self.staging says to. Called periodically until
+        rooms are open
+        :return: True if any assignments were made
         """
-        self.open_breakout_room_menu()
-        exists, _ = self.check_if_exists(By.CLASS_NAME, "bo-room-not-started-footer__btn-wrapper")
-        return not exists
 
-    def start_breakout_rooms(self):
-        """
-        Clicks "Open Breakout Rooms" button
-        :return:
-        """
+        if self.staging is None or self.staging.opened:
+            return False
 
-        self.d.find_element_by_class_name("bo-room-not-started-footer__actions")\
-            .find_element_by_xpath(".//div[4]/button[1]").click()
+        if self.breakout_rooms_started():
+            print("Breakout rooms were opened by someone else. Staging has ended")
+            self.staging.mark_opened()
+            return False
 
-    def ask_for_help_window_open(self):
-        """
-        Returns True if the "Ask Host For Help" window is open
-        :return:
-        """
-        exists, _ = self.check_if_exists(By.XPATH, '//div[contains(@aria-label, "asked for help.")]')
-        return exists
+        applied = self.apply_staged()
 
-    def close_ask_for_help(self):
-        """
-        Closes the "Ask Host for Help" window and sends a message to chat with the details of who asked for help
-        :return:
-        """
+        if self.staging.should_open():
+            print(f"Opening breakout rooms with {len(self.staging.applied)} users assigned. "
+                  f"{len(self.staging.pending)} staged users could not be found: {sorted(self.staging.pending)}")
+            self.start_breakout_rooms()
+            self.staging.mark_opened()
 
-        mod_wind = self.d.find_element_by_xpath('//div[contains(@aria-label, "asked for help.")]')
-        help_text = mod_wind.find_element_by_class_name('content').get_attribute("innerText")
-        mod_wind.find_element_by_xpath('.//button[@aria-label="close modal"]').click()
-        self.send_message_to_chat(help_text)
+        return applied > 0
 
-    def room_idx(self, target_room, start_at_zero=False, unassigned_incl=False, skip=None):
+    def roster_snapshot(self, update_roster=True):
         """
-        Returns the index of target_room based on its name
+        Reads the whole breakout room list in one execute_script call. Collapsed rooms are expanded and the list is
+        read once more so that their attendees are included
 
-        :param target_room: room name
-        :param start_at_zero: indicates whether the list uses Python indexing or DOM indexing
-        :param unassigned_incl: indicates whether "Unassigned" appears on the list
-        :param skip: Any elements that will be excluded from the list
-        :return: Integer index
+        The first list item is keyed as "Unassigned" when it is not the first room in room_names
+        :param update_roster: if True, the snapshot is also applied to self.roster
+        :return: dict of room name -> {"idx": 1-based DOM index, "expanded": bool, "attendees": [names]}, in DOM order
         """
 
-        uro     = self.unassigned_room_open()
-        offset  = 0
-
-        if target_room in self.room_names:
-            base_idx = self.room_names.index(target_room)
-            if unassigned_incl and uro:
-                offset += 1
-        elif target_room == "Unassigned" and uro:
-            base_idx = 0
-        elif target_room == "Unassigned" and not uro:
-            return None
-        else:
-            msg = f"target room: {target_room}, start at zero: {start_at_zero}, " \
-                  f"unassigned included: {unassigned_incl}, skip: {skip}"
-            raise RoomIndexNotFoundException(msg)
+        rooms = self.d.execute_script(ROSTER_SNAPSHOT_JS, True)
+        if not all(room["expanded"] for room in rooms):
+            rooms = self.d.execute_script(ROSTER_SNAPSHOT_JS, False)
 
-        if not start_at_zero:
-            offset += 1
+        snapshot = dict()
+        for room in rooms:
+            name = room.pop("name")
+            if room["idx"] == 1 and name != self.room_names[0]:
+                name = "Unassigned"
+            snapshot[name] = room
 
-        if skip is not None:
-            if "Unassigned" in skip:
-                skip.remove("Unassigned")
-            
-            for room in skip:
-                if self.room_names.index(room) < base_idx:
-                    offset -= 1
+        # An empty list means the breakout room menu is closed, not that everyone has left
+        if snapshot:
+            if self.recorder is not None:
+                self.recorder.roster(snapshot)
+            if update_roster:
+                self.roster.apply_snapshot(snapshot)
 
-        return base_idx + offset
+        return snapshot
 
-    def last_known_location(self, target_user):
+    def refresh_roster(self):
         """
-        Returns the last known location of a user based on the dictionary self.user_locs
-        :param target_user:
-        :return:
+        Takes a roster snapshot to bring self.roster up to date, picking up moves the bot didn't make
+        :return: list of (user, old room, new room) changes, see RosterIndex.apply_snapshot
         """
 
-        if target_user in self.user_locs.keys():
-            return self.user_locs[target_user]
-        else:
-            return "Unassigned"
+        snapshot = self.roster_snapshot(update_roster=False)
+        if not snapshot:
+            return []
+        return self.roster.apply_snapshot(snapshot)
 
-    def attendee_idx(self, target_user, room, start_at_zero=False):
+    def breakout_rooms_started(self, state=None):
         """
-        Returns the index of a particular target user based on their name
-        :param target_user: user name
-        :param room: room that user is currently in
-        :param start_at_zero: indicates whether Python indexing or DOM indexing is used
-        :return: Integer index
+        Returns True if breakout rooms have started. The breakout room menu is opened first if it is closed
+        :param state: result of ui_state earlier in the same tick, read now if None. Updated in place if the menu had
+            to be opened, so later calls in the tick see it open
+        :return:
         """
 
-        if start_at_zero:
-            offset = 0
-        else:
-            offset = 1
+        if state is None:
+            state = self.ui_state()
 
-        attendees = self.room_participants(room)
-        return attendees.index(target_user) + offset
+        if not state["breakout_menu_open"]:
+            self.open_breakout_room_menu()
+            state.update(self.ui_state())
 
-    def unassigned_room_open(self):
+        return bool(state["rooms_started"])
+
+    def start_breakout_rooms(self):
         """
-        Returns True if Breakout rooms are open and there are unassigned users
+        Clicks "Open Breakout Rooms" button
         :return:
         """
 
-        first_bo_item_name = self.d.find_element_by_class_name("bo-room-item-container__title")\
-            .get_attribute("innerText")
-        if first_bo_item_name != self.room_names[0]:
-            return True
-        return False
+        self.locators.with_element(By.CLASS_NAME, "bo-room-not-started-footer__actions",
+                                   lambda actions: actions.find_element_by_xpath(".//div[4]/button[1]").click())
+        self.locators.invalidate()
 
-    def room_name_valid(self, room_name):
+    def ask_for_help_window_open(self, state=None):
         """
-        Returns true if the room name is Unassigned or in the name list
-        :param room_name:
+        Returns True if the "Ask Host For Help" window is open
+        :param state: result of ui_state, read now if None
         :return:
         """
 
-        return room_name in self.room_names or room_name == "Unassigned"
+        if state is None:
+            state = self.ui_state()
 
-    def assign_attendee_to_room(self, attendee, target_room, lk_room_name):
+        return state["help_window_open"]
+
+    def close_ask_for_help(self):
         """
-        Clcicks the Assign button next to a uaer's name to move them to target_room
-        :param attendee:
-        :param target_room:
-        :param lk_room_name:
+        Closes the "Ask Host for Help" window and sends a message to chat with the details of who asked for help
         :return:
         """
 
-        # Click Assign To
-        ActionChains(self.d).move_to_element(attendee).perform()
-        assign_button = self.d.find_element_by_class_name("bo-room-item-attendee__tools").\
-            find_element_by_xpath(".//button")
-
-        ActionChains(self.d).move_to_element(assign_button).click().perform()
-        assign_box = self.d.find_element_by_class_name("bo-room-item-attendee__moveto-list-scrollbar")
-
-        options = assign_box.find_elements_by_class_name("zmu-data-selector-item")
-        options[self.room_idx(target_room, start_at_zero=True, unassigned_incl=False, skip=[lk_room_name])].click()
-
-    def trim_messages(self, messages, authors, num):
-        """Trims the most recent message in the chat using the internal memory. This is to prevent re-execution of
-        commands which have already been performed.
-
-        The issue here is that Zoom groups together your most recent messages into one message. For example, if you sent
-        a message 10 minutes ago and then sent a new message, both of those would be returned as your newest message,
-        provided no one else sent anything to the chat in the interim. The goal here is to only grab new content."""
-
-        most_recent_messages        = messages[-num:]
-        most_recent_authors         = authors[-num:]
-        most_recent_messages_mem    = self.n_most_recent[1][-num:]
-        most_recent_authors_mem     = self.n_most_recent[0][-num:]
-
-        msg_copy = messages[:]
-        if len(most_recent_messages_mem) > 0:
-            for i, msg in enumerate(most_recent_messages):
-                if most_recent_authors[i] == most_recent_authors_mem[i]:
-                    msg_copy[i] = msg.replace(most_recent_messages_mem[i], "")
-
-        return msg_copy
+        mod_wind = self.d.find_element_by_xpath('//div[contains(@aria-label, "asked for help.")]')
+        help_text = mod_wind.find_element_by_class_name('content').get_attribute("innerText")
+        mod_wind.find_element_by_xpath('.//button[@aria-label="close modal"]').click()
+        self.send_message_to_chat(help_text)
 
     def disable_video_receiving(self):
         """
@@ -0,0 +1,393 @@
+"""
+JavaScript snippets that are injected into the Zoom web client with execute_script. Each snippet reads (or acts on) a
+whole region of the DOM in one WebDriver round trip and returns plain JSON-compatible values
+"""
+
+# Returns the n most recent chat items as [{"idx": int, "author": str, "message": str}, ...]. idx is the position of
+# the item in the full chat list, so it stays stable while new items are appended. n <= 0 returns every item
+CHAT_SNAPSHOT_JS = """
+var n = arguments[0];
+function innerTextAt(xpath, ctx) {
+    var node = document.evaluate(xpath, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return node === null ? "" : node.innerText;
+}
+var items = document.getElementsByClassName("chat-item__chat-info");
+var start = n > 0 ? Math.max(items.length - n, 0) : 0;
+var out = [];
+for (var i = start; i < items.length; i++) {
+    out.push({"idx": i,
+              "author": innerTextAt(".//div[1]/span[1]", items[i]).trim(),
+              "message": innerTextAt(".//pre[1]", items[i])});
+}
+return out;
+"""
+
+# Returns every breakout room list item as [{"idx": int, "name": str, "expanded": bool, "attendees": [str, ...]}, ...]
+# in DOM order. idx is the 1-based position of the room's li, matching the ".//ul/li[idx]" xpaths. When arguments[0]
+# is true, collapsed rooms are clicked open after being read so that a follow-up snapshot can list their attendees
+ROSTER_SNAPSHOT_JS = """
+var expand = arguments[0];
+var container = document.getElementsByClassName("bo-room-list-container")[0];
+if (container === undefined) {
+    return [];
+}
+var rooms = container.querySelectorAll("ul > li");
+var out = [];
+for (var i = 0; i < rooms.length; i++) {
+    var title = rooms[i].getElementsByClassName("bo-room-item-container__title")[0];
+    var banner = rooms[i].querySelector("div[aria-expanded]");
+    var expanded = banner === null || banner.getAttribute("aria-expanded") === "true";
+    var attendees = [];
+    var names = rooms[i].querySelectorAll(".bo-room-item-attendee span[class^='bo-room-item-attendee__name']");
+    for (var j = 0; j < names.length; j++) {
+        attendees.push(names[j].innerText);
+    }
+    if (expand && !expanded) {
+        banner.parentElement.click();
+    }
+    out.push({"idx": i + 1,
+              "name": title === undefined ? "" : title.innerText,
+              "expanded": expanded,
+              "attendees": attendees});
+}
+return out;
+"""
+
+# Installs a MutationObserver that pushes every new chat line into window.__zoombotChat.buffer as
+# {"seq": int, "author": str, "line": str, "time": seconds since the epoch}. Zoom merges consecutive messages from one
+# author into a single chat item, so lines are counted per item and only lines past the last count are pushed. Lines
+# already in the chat when the observer is installed are not pushed. Returns false if an observer was already installed
+# on this page
+INSTALL_CHAT_OBSERVER_JS = """
+if (window.__zoombotChat !== undefined) {
+    return false;
+}
+var state = {"seq": 0, "buffer": [], "seen": new WeakMap()};
+window.__zoombotChat = state;
+function innerTextAt(xpath, ctx) {
+    var node = document.evaluate(xpath, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return node === null ? "" : node.innerText;
+}
+function linesOf(item) {
+    var text = innerTextAt(".//pre[1]", item);
+    return text === "" ? [] : text.split("\\n");
+}
+function scan(item, push) {
+    var lines = linesOf(item);
+    var seen = state.seen.has(item) ? state.seen.get(item) : 0;
+    if (push) {
+        var author = innerTextAt(".//div[1]/span[1]", item).trim();
+        for (var i = seen; i < lines.length; i++) {
+            state.seq += 1;
+            state.buffer.push({"seq": state.seq, "author": author, "line": lines[i], "time": Date.now() / 1000});
+        }
+    }
+    state.seen.set(item, Math.max(seen, lines.length));
+}
+var existing = document.getElementsByClassName("chat-item__chat-info");
+for (var i = 0; i < existing.length; i++) {
+    scan(existing[i], false);
+}
+var observer = new MutationObserver(function (records) {
+    var touched = new Set();
+    records.forEach(function (record) {
+        var target = record.target.nodeType === Node.ELEMENT_NODE ? record.target : record.target.parentElement;
+        var item = target === null ? null : target.closest(".chat-item__chat-info");
+        if (item !== null) {
+            touched.add(item);
+        }
+        record.addedNodes.forEach(function (node) {
+            if (node.nodeType !== Node.ELEMENT_NODE) {
+                return;
+            }
+            if (node.classList.contains("chat-item__chat-info")) {
+                touched.add(node);
+            }
+            node.querySelectorAll(".chat-item__chat-info").forEach(function (child) { touched.add(child); });
+        });
+    });
+    touched.forEach(function (item) { scan(item, true); });
+});
+observer.observe(document.body, {"childList": true, "subtree": true, "characterData": true});
+return true;
+"""
+
+# Empties the buffer filled by INSTALL_CHAT_OBSERVER_JS and returns its events, oldest first. Returns null if the
+# observer is not installed, e.g. after the page has been reloaded
+DRAIN_CHAT_EVENTS_JS = """
+if (window.__zoombotChat === undefined) {
+    return null;
+}
+return window.__zoombotChat.buffer.splice(0);
+"""
+
+# Returns the first element matching (arguments[0], arguments[1]), where arguments[0] is one of the selenium By values
+# "xpath", "class name", "id", "name" or "css selector", or null if there is none. Unlike find_element this never waits
+PROBE_ELEMENT_JS = """
+var by = arguments[0];
+var value = arguments[1];
+if (by === "xpath") {
+    return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+} else if (by === "class name") {
+    return document.getElementsByClassName(value)[0] || null;
+} else if (by === "id") {
+    return document.getElementById(value);
+} else if (by === "name") {
+    return document.getElementsByName(value)[0] || null;
+}
+return document.querySelector(value);
+"""
+
+# Returns the state of the parts of the meeting UI that are checked every tick. arguments[0] is the first room name,
+# used to tell whether the Unassigned pseudo-room heads the room list. rooms_started is null when the breakout room
+# menu is closed, because the footer that shows it is only rendered while the menu is open
+UI_STATE_JS = """
+function exists(xpath) {
+    return document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null;
+}
+var menuOpen = document.getElementsByClassName("bo-room-item-container__btn-group").length > 0;
+var firstTitle = document.getElementsByClassName("bo-room-item-container__title")[0];
+return {"help_window_open": exists('//div[contains(@aria-label, "asked for help.")]'),
+        "breakout_menu_open": menuOpen,
+        "rooms_started": menuOpen ?
+            document.getElementsByClassName("bo-room-not-started-footer__btn-wrapper").length === 0 : null,
+        "unassigned_present": firstTitle !== undefined && firstTitle.innerText !== arguments[0],
+        "chat_open": document.getElementsByClassName("chat-box__chat-textarea").length > 0};
+"""
+
+# Moves one attendee in a single execute_async_script call. arguments are (user name, target room, timeout in ms). The
+# attendee is found by name in any room, hovered so that its tools appear, its "Move to" button clicked and the menu
+# option whose label is the target room clicked. Menus that render asynchronously are polled for until the timeout.
+# Calls back with {"ok": bool, "reason": str or null, "source": str or null, "options": [str, ...]}, where source is
+# the title of the room the attendee was found in and options lists the menu labels if the target was not among them
+MOVE_ATTENDEE_JS = """
+var user = arguments[0];
+var target = arguments[1];
+var timeout = arguments[2];
+var done = arguments[arguments.length - 1];
+var result = {"ok": false, "reason": null, "source": null, "options": []};
+function finish(reason) {
+    result.ok = reason === null;
+    result.reason = reason;
+    done(result);
+}
+function hover(node) {
+    ["mouseover", "mouseenter", "mousemove"].forEach(function (type) {
+        node.dispatchEvent(new MouseEvent(type, {"bubbles": true, "view": window}));
+    });
+}
+function poll(find, then, what) {
+    var deadline = Date.now() + timeout;
+    (function step() {
+        var found = find();
+        if (found) {
+            return then(found);
+        }
+        if (Date.now() > deadline) {
+            return finish(what + " did not appear");
+        }
+        setTimeout(step, 25);
+    })();
+}
+var container = document.getElementsByClassName("bo-room-list-container")[0];
+if (container === undefined) {
+    return finish("breakout room list is not open");
+}
+var attendee = null;
+var rooms = container.querySelectorAll("ul > li");
+for (var i = 0; i < rooms.length && attendee === null; i++) {
+    var names = rooms[i].querySelectorAll(".bo-room-item-attendee span[class^='bo-room-item-attendee__name']");
+    for (var j = 0; j < names.length; j++) {
+        if (names[j].innerText === user) {
+            attendee = names[j].closest(".bo-room-item-attendee");
+            var title = rooms[i].getElementsByClassName("bo-room-item-container__title")[0];
+            result.source = title === undefined ? "" : title.innerText;
+            break;
+        }
+    }
+}
+if (attendee === null) {
+    return finish("attendee not found");
+}
+hover(attendee);
+poll(function () { return attendee.querySelector(".bo-room-item-attendee__tools button"); }, function (button) {
+    button.click();
+    poll(function () { return document.querySelector(".bo-room-item-attendee__moveto-list-scrollbar"); },
+         function (menu) {
+        var options = menu.getElementsByClassName("zmu-data-selector-item");
+        for (var k = 0; k < options.length; k++) {
+            var label = options[k].innerText.trim();
+            if (label === target) {
+                options[k].click();
+                return finish(null);
+            }
+            result.options.push(label);
+        }
+        finish("no menu option for the target room");
+    }, "move-to menu");
+}, "move-to button");
+"""
+
+# Assigns attendees to a room in one execute_async_script call, before rooms are started. arguments are (room name,
+# list of user names, timeout in ms). The room's assign button is clicked, the assign dialog is polled for until the
+# timeout, every name listed in it is read, and each user whose name is listed is clicked. Items are looked up again
+# before each click, as the dialog may re-render after one. Calls back with {"ok": bool, "reason": str or null,
+# "labels": [str, ...], "clicked": [str, ...]}, where labels lists every name in the dialog
+ASSIGN_USERS_JS = """
+var room = arguments[0];
+var users = arguments[1];
+var timeout = arguments[2];
+var done = arguments[arguments.length - 1];
+var result = {"ok": false, "reason": null, "labels": [], "clicked": []};
+function first(xpath, ctx) {
+    return document.evaluate(xpath, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function label(item) {
+    var node = first(".//span/span[2]/span", item);
+    return node === null ? "" : node.innerText;
+}
+function finish(reason) {
+    result.ok = reason === null;
+    result.reason = reason;
+    done(result);
+}
+var button = first('//div[starts-with(@aria-label, "' + room.replace(/"/g, "") + '")]/div[2]/button', document);
+if (button === null) {
+    return finish("assign button not found");
+}
+button.click();
+var deadline = Date.now() + timeout;
+(function step() {
+    var list = document.getElementsByClassName("bo-room-assign-list-scrollbar")[0];
+    if (list === undefined) {
+        if (Date.now() > deadline) {
+            return finish("assign dialog did not appear");
+        }
+        return setTimeout(step, 25);
+    }
+    var items = list.getElementsByClassName("zmu-data-selector-item");
+    for (var i = 0; i < items.length; i++) {
+        result.labels.push(label(items[i]));
+    }
+    users.forEach(function (user) {
+        var items = list.getElementsByClassName("zmu-data-selector-item");
+        for (var i = 0; i < items.length; i++) {
+            if (label(items[i]) === user) {
+                items[i].click();
+                result.clicked.push(user);
+                return;
+            }
+        }
+    });
+    finish(null);
+})();
+"""
+
+# Returns which one-off setup steps are already in effect on the page, and which controls the remaining steps need are
+# shown, so that setup steps can be started as soon as they can run and skipped if already done. in_meeting is true once
+# the meeting footer with the chat pane button is shown
+SETUP_STATE_JS = """
+function exists(xpath) {
+    return document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null;
+}
+return {"in_meeting": exists('//button[@aria-label="open the chat pane" or @aria-label="close the chat pane"]'),
+        "chat_open": document.getElementsByClassName("chat-box__chat-textarea").length > 0,
+        "chat_observer": window.__zoombotChat !== undefined,
+        "participants_open": exists('//button[starts-with(@aria-label, "close the manage participants list pane")]'),
+        "participants_button": exists('//button[starts-with(@aria-label, "open the manage participants list pane")' +
+                                      ' or starts-with(@aria-label, "close the manage participants list pane")]'),
+        "audio_prompt": exists('//div[@data-focus-lock-disabled="false"]/div/div/button'),
+        "more_button": document.getElementById("moreButton") !== null,
+        "share_menu": document.getElementById("sharePermissionMenu") !== null};
+"""
+
+# Renames the breakout rooms in one execute_async_script call, before rooms are started. arguments are (list of names,
+# timeout in ms per dialog). Room i of the list is hovered, its rename button clicked, the name typed into the
+# confirm-tip input and confirmed, and the script waits for the tip to close before the next room. The value is set
+# through the native input setter followed by an input event so that the page's own change handlers see it. Calls back
+# with one entry per name, null if the room was renamed or a short reason if not, or null if the room list isn't shown
+RENAME_ROOMS_JS = """
+var names = arguments[0];
+var timeout = arguments[1];
+var done = arguments[arguments.length - 1];
+var setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, "value").set;
+var results = [];
+function first(xpath, ctx) {
+    return document.evaluate(xpath, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function hover(node) {
+    ["mouseover", "mouseenter", "mousemove"].forEach(function (type) {
+        node.dispatchEvent(new MouseEvent(type, {"bubbles": true, "view": window}));
+    });
+}
+function poll(find, then, fail) {
+    var deadline = Date.now() + timeout;
+    (function step() {
+        var found = find();
+        if (found) {
+            return then(found);
+        }
+        if (Date.now() > deadline) {
+            return fail();
+        }
+        setTimeout(step, 25);
+    })();
+}
+var container = document.getElementsByClassName("bo-room-list-container")[0];
+if (container === undefined) {
+    return done(null);
+}
+var rooms = container.querySelectorAll("ul > li");
+function renameAt(i) {
+    if (i >= names.length) {
+        return done(results);
+    }
+    function fail(reason) {
+        return function () {
+            results.push(reason);
+            renameAt(i + 1);
+        };
+    }
+    var content = rooms[i] === undefined ? null : first(".//div/div/div", rooms[i]);
+    if (content === null) {
+        return fail("room list item missing")();
+    }
+    hover(content);
+    content.click();
+    poll(function () { return first(".//button[1]", content); }, function (button) {
+        button.click();
+        poll(function () { return document.querySelector(".confirm-tip__tip input"); }, function (input) {
+            setValue.call(input, names[i]);
+            input.dispatchEvent(new Event("input", {"bubbles": true}));
+            var footer = document.getElementsByClassName("confirm-tip__footer")[0];
+            var confirm = footer === undefined ? null : first(".//button[1]", footer);
+            if (confirm === null) {
+                return fail("confirm button missing")();
+            }
+            confirm.click();
+            poll(function () { return document.getElementsByClassName("confirm-tip__tip").length === 0; },
+                 function () { results.push(null); renameAt(i + 1); }, fail("rename dialog did not close"));
+        }, fail("rename dialog did not open"));
+    }, fail("rename button did not appear"));
+}
+renameAt(0);
+"""
+
+# Posts arguments[0] to the chat in one call. The text is put into the chat textarea through the native value setter,
+# followed by an input event so that the page's own change handlers see it, and Enter is then pressed on the textarea.
+# Lines in the text stay together as one message, which typing them with send_keys would not do. Returns false if the
+# chat textarea isn't shown
+POST_CHAT_JS = """
+var textarea = document.getElementsByClassName("chat-box__chat-textarea")[0];
+if (textarea === undefined) {
+    return false;
+}
+var setValue = Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, "value").set;
+setValue.call(textarea, arguments[0]);
+textarea.dispatchEvent(new Event("input", {"bubbles": true}));
+["keydown", "keypress", "keyup"].forEach(function (type) {
+    textarea.dispatchEvent(new KeyboardEvent(type, {"key": "Enter", "code": "Enter", "keyCode": 13, "which": 13,
+                                                    "bubbles": true, "cancelable": true}));
+});
+return true;
+"""